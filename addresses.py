@@ -0,0 +1,222 @@
+"""
+Parse RESIDENTIAL_ADDRESS1 values into house number, suffix, directionals, street name,
+street type and unit, with USPS standard abbreviations:
+
+    "1256-B Arthur Drive N.W."  ->  1256, B, "", ARTHUR, DR, NW        StreetName "ARTHUR DR NW"
+    "376 1/2 South Leavitt Rd"  ->  376, 1/2, S, LEAVITT, RD, ""       StreetName "S LEAVITT RD"
+    "1408 Kensington St NW Apt 3" -> ... unit "APT 3"
+
+parse_address is memoized on the raw string, and the vectorized helpers parse each distinct
+value once, since thousands of voters share a street.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+import pandas as pd
+
+DIRECTIONALS = {
+    "N": "N", "NORTH": "N", "S": "S", "SOUTH": "S", "E": "E", "EAST": "E", "W": "W", "WEST": "W",
+    "NE": "NE", "NORTHEAST": "NE", "NW": "NW", "NORTHWEST": "NW",
+    "SE": "SE", "SOUTHEAST": "SE", "SW": "SW", "SOUTHWEST": "SW",
+}
+
+# USPS street suffix abbreviations (Publication 28, the common ones).
+STREET_TYPES = {
+    "ALLEY": "ALY", "ALY": "ALY", "AVENUE": "AVE", "AVE": "AVE", "AV": "AVE", "AVN": "AVE",
+    "BOULEVARD": "BLVD", "BLVD": "BLVD", "BOUL": "BLVD", "CIRCLE": "CIR", "CIR": "CIR", "CIRC": "CIR",
+    "COURT": "CT", "CT": "CT", "COVE": "CV", "CV": "CV", "CROSSING": "XING", "XING": "XING",
+    "DRIVE": "DR", "DR": "DR", "DRV": "DR", "EXTENSION": "EXT", "EXT": "EXT", "HIGHWAY": "HWY", "HWY": "HWY",
+    "LANE": "LN", "LN": "LN", "LOOP": "LOOP", "PARK": "PARK", "PARKWAY": "PKWY", "PKWY": "PKWY",
+    "PIKE": "PIKE", "PLACE": "PL", "PL": "PL", "PLAZA": "PLZ", "PLZ": "PLZ", "POINT": "PT", "PT": "PT",
+    "ROAD": "RD", "RD": "RD", "ROUTE": "RTE", "RTE": "RTE", "RUN": "RUN", "SQUARE": "SQ", "SQ": "SQ",
+    "STREET": "ST", "ST": "ST", "STR": "ST", "TERRACE": "TER", "TER": "TER", "TERR": "TER",
+    "TRAIL": "TRL", "TRL": "TRL", "WAY": "WAY",
+}
+
+# Secondary-unit designators, as they appear in RESIDENTIAL_ADDRESS1 or RESIDENTIAL_SECONDARY_ADDR.
+UNIT_DESIGNATORS = {
+    "APARTMENT": "APT", "APT": "APT", "BUILDING": "BLDG", "BLDG": "BLDG", "FLOOR": "FL", "FL": "FL",
+    "FRONT": "FRNT", "FRNT": "FRNT", "LOT": "LOT", "LOWER": "LOWR", "LOWR": "LOWR", "REAR": "REAR",
+    "ROOM": "RM", "RM": "RM", "SUITE": "STE", "STE": "STE", "TRAILER": "TRLR", "TRLR": "TRLR",
+    "UNIT": "UNIT", "UPPER": "UPPR", "UPPR": "UPPR", "#": "#",
+}
+
+# Columns of parse_addresses, in order.
+ADDRESS_COLUMNS = ["HOUSE_NUMBER", "HOUSE_SUFFIX", "PREDIRECTIONAL", "STREET", "STREET_TYPE", "POSTDIRECTIONAL",
+                   "UNIT", "StreetName"]
+
+# Distinct raw addresses remembered by parse_address; a large county has a few hundred thousand.
+ADDRESS_CACHE_SIZE = 1 << 18
+
+# "1256", "1256B", "1256-B", "1256-12": the number and an optional suffix.
+_HOUSE_NUMBER = re.compile(r"^(\d+)(?:-?([A-Z]{1,2}|\d+))?$")
+_PO_BOX = re.compile(r"^(?:P ?O )?BOX\b|^POST OFFICE BOX\b")
+# What follows a unit designator: "3", "3A", "12-B", "B".
+_UNIT_ID = re.compile(r"^(?:[A-Z]|[A-Z0-9-]*\d[A-Z0-9-]*)$")
+
+
+class Address(NamedTuple):
+    house_number: str     # digits only, "" when the address has none
+    house_suffix: str     # "B", "1/2" or ""
+    predirectional: str
+    street: str
+    street_type: str
+    postdirectional: str
+    unit: str             # "APT 3", "#3" or ""
+
+    @property
+    def street_name(self):
+        """
+        The street as it appears in StreetName: "S LEAVITT RD", "ARTHUR DR NW".
+        """
+        return " ".join(part for part in (self.predirectional, self.street, self.street_type,
+                                          self.postdirectional) if part)
+
+    @property
+    def normalized(self):
+        """
+        The whole address in one standard spelling, e.g. "1256B ARTHUR DR NW APT 3".
+        """
+        number = self.house_number + (f" {self.house_suffix}" if "/" in self.house_suffix else self.house_suffix)
+        return " ".join(part for part in (number, self.street_name, self.unit) if part)
+
+
+def clean(raw):
+    """
+    Upper-case, drop periods ("N.W." -> "NW"), turn commas into spaces and collapse runs of spaces.
+    """
+    return " ".join(str(raw).upper().replace(".", "").replace(",", " ").split())
+
+
+def _unit(tokens):
+    """
+    "APT 3" from ["APARTMENT", "3"], "#3" from ["#", "3"] or ["#3"].
+    """
+    if not tokens:
+        return ""
+    first = tokens[0]
+    if first.startswith("#"):
+        return "#" + "".join([first[1:]] + tokens[1:])
+    designator = UNIT_DESIGNATORS.get(first)
+    if designator is None:
+        return " ".join(tokens)
+    if designator == "#":
+        return "#" + "".join(tokens[1:])
+    return " ".join([designator] + tokens[1:])
+
+
+def _names_street(tokens):
+    """
+    True when tokens hold a street name besides directionals and street types.
+    """
+    return any(token not in DIRECTIONALS and token not in STREET_TYPES for token in tokens)
+
+
+def _is_unit_at(tokens, i):
+    """
+    True when tokens[i] starts the unit: "#3", or a designator that ends the address or is
+    followed by an identifier ("APT 3", "REAR"), after a street name. So FRONT in
+    "N FRONT ST" and LOWER in "E LOWER RIVER RD" stay part of the street.
+    """
+    token = tokens[i]
+    if token.startswith("#") and len(token) > 1:
+        return _names_street(tokens[:i])
+    if token not in UNIT_DESIGNATORS:
+        return False
+    followed = i + 1 == len(tokens) or bool(_UNIT_ID.match(tokens[i + 1]))
+    return followed and _names_street(tokens[:i])
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def parse_address(raw):
+    """
+    The Address of one raw RESIDENTIAL_ADDRESS1 string. PO boxes and addresses without a
+    leading number keep their words as the street.
+    """
+    text = clean(raw)
+    tokens = text.split()
+    if not tokens:
+        return Address("", "", "", "", "", "", "")
+    if _PO_BOX.match(text):
+        return Address("", "", "", text, "", "", "")
+
+    # Unit words before the house number ("REAR 1256 ARTHUR DR") go to the unit.
+    leading = []
+    count = 0
+    while count < len(tokens) - 1 and tokens[count] in UNIT_DESIGNATORS and tokens[count] != "#":
+        count += 1
+    if count and _HOUSE_NUMBER.match(tokens[count]):
+        leading, tokens = tokens[:count], tokens[count:]
+
+    number = suffix = ""
+    match = _HOUSE_NUMBER.match(tokens[0])
+    if match:
+        number, suffix = match.group(1), match.group(2) or ""
+        tokens = tokens[1:]
+
+    # Everything from the first unit designator on is the unit.
+    unit = ""
+    for i in range(1, len(tokens)):
+        if _is_unit_at(tokens, i):
+            unit = _unit(tokens[i:])
+            tokens = tokens[:i]
+            break
+
+    # "1256 1/2 ARTHUR", "1256 B ARTHUR": a lone letter that is not a directional, but only
+    # while a street name follows it ("1256 B ST NW" is on B Street).
+    if number and not suffix and len(tokens) > 1 and _names_street(tokens[1:]) and (
+            tokens[0] == "1/2" or (len(tokens[0]) == 1 and tokens[0].isalpha() and tokens[0] not in DIRECTIONALS)):
+        suffix = tokens.pop(0)
+    if leading:
+        unit = " ".join([_unit(leading)] + ([unit] if unit else []))
+
+    postdirectional = predirectional = street_type = ""
+    if len(tokens) > 1 and tokens[-1] in DIRECTIONALS:
+        postdirectional = DIRECTIONALS[tokens.pop()]
+    if len(tokens) > 1 and tokens[-1] in STREET_TYPES:
+        street_type = STREET_TYPES[tokens.pop()]
+    if len(tokens) > 1 and tokens[0] in DIRECTIONALS:
+        predirectional = DIRECTIONALS[tokens.pop(0)]
+    return Address(number, suffix, predirectional, " ".join(tokens), street_type, postdirectional, unit)
+
+
+def _distinct(values):
+    values = pd.Series(values, copy=False).astype(object)
+    return values, pd.Series(values.dropna().unique(), dtype=object)
+
+
+def parse_addresses(values):
+    """
+    parse_address over a column, as a DataFrame of ADDRESS_COLUMNS aligned with values
+    (HOUSE_NUMBER stays text; blanks give empty strings).
+    """
+    values, distinct = _distinct(values)
+    rows = [(*address, address.street_name) for address in map(parse_address, distinct)]
+    parsed = pd.DataFrame(rows, columns=ADDRESS_COLUMNS, index=distinct)
+    parsed = parsed.reindex(values.where(values.notna(), None)).fillna("")
+    return parsed.set_axis(values.index)
+
+
+def normalize_addresses(values):
+    """
+    The standard spelling (Address.normalized) of every value; blanks become "".
+    """
+    values, distinct = _distinct(values)
+    return values.map(dict(zip(distinct, (parse_address(raw).normalized for raw in distinct)))).fillna("")
+
+
+def street_names(values):
+    """
+    The StreetName of every value ("" for blanks).
+    """
+    values, distinct = _distinct(values)
+    return values.map(dict(zip(distinct, (parse_address(raw).street_name for raw in distinct)))).fillna("")
+
+
+def normalize_units(values):
+    """
+    RESIDENTIAL_SECONDARY_ADDR values in one spelling: "Apartment 3" -> "APT 3", "# 3" -> "#3".
+    """
+    values, distinct = _distinct(values)
+    return values.map(dict(zip(distinct, (_unit(clean(raw).split()) for raw in distinct)))).fillna("")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Time each stage of the voter pipeline on synthetic SOS-format county files, fully offline.
+
+    python benchmark.py --sizes 10000 100000 1000000
+
+Stages: csv_read, ward_filter, sort, score, ward_split, csv_write, xlsx_write.
+One JSON record per (size, stage) is appended to the results file, so runs can be compared
+across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from synthetic_voters import write_synthetic_file
+from voter_export import write_voter_workbook
+from voter_ingest import read_voter_csv
+from voter_scores import add_scores
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class StageTimer:
+    """
+    Collects (stage, seconds, count) records for one benchmark size; count is rows for
+    frame stages and files for the split/write stages.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.records = []
+
+    def run(self, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        count = len(result) if hasattr(result, "__len__") else None
+        self.records.append({"size": self.size, "stage": stage, "seconds": round(seconds, 4), "count": count})
+        print(f"  {self.size:>9} {stage:<12} {seconds:9.3f}s  n={count}")
+        return result
+
+
+def write_ward_files(ward_frames, out_dir, writer, suffix):
+    paths = []
+    for ward, ward_df in ward_frames:
+        path = os.path.join(out_dir, f"City_of_{ward}{suffix}")
+        writer(ward_df, path)
+        paths.append(path)
+    return paths
+
+
+def benchmark_size(size, data_dir, xlsx_max_rows):
+    """
+    Run every stage on a synthetic county file of size rows (generated once and reused).
+    """
+    path = os.path.join(data_dir, f"synthetic-{size}.txt")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        write_synthetic_file(path, size)
+    out_dir = os.path.join(data_dir, f"out-{size}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    timer = StageTimer(size)
+    df = timer.run("csv_read", read_voter_csv, path)
+    filtered = timer.run("ward_filter", lambda: df[df["WARD"].str.contains("WARREN-WARD", case=False, na=False)])
+    sorted_df = timer.run("sort", filtered.sort_values, by="PRECINCT_NAME")
+    scored = timer.run("score", add_scores, sorted_df)
+    wards = timer.run("ward_split", lambda: list(scored.groupby("WARD", sort=False, observed=True)))
+    timer.run("csv_write", write_ward_files, wards, out_dir,
+              lambda frame, p: frame.to_csv(p, index=False), ".csv")
+    if len(scored) <= xlsx_max_rows:
+        timer.run("xlsx_write", write_ward_files, wards, out_dir, write_voter_workbook, ".xlsx")
+    else:
+        print(f"  {size:>9} xlsx_write   skipped ({len(scored)} rows > --xlsx-max-rows {xlsx_max_rows})")
+    return timer.records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, scoring and export on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="county sizes in rows")
+    parser.add_argument("--data-dir", default=os.path.join(os.getcwd(), "benchmark-data"),
+                        help="where synthetic inputs and outputs are kept")
+    parser.add_argument("--output", help="JSON lines file results are appended to "
+                                         "(default: benchmark-results.jsonl in the data directory)")
+    parser.add_argument("--xlsx-max-rows", type=int, default=50000,
+                        help="skip the xlsx stage when the Warren subset is larger than this")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    args.output = args.output or os.path.join(args.data_dir, "benchmark-results.jsonl")
+    run = {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+    with open(args.output, "a") as f:
+        for size in args.sizes:
+            for record in benchmark_size(size, args.data_dir, args.xlsx_max_rows):
+                f.write(json.dumps({**run, **record}) + "\n")
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
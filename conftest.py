@@ -0,0 +1 @@
+# Lets pytest import the repo's top-level modules from tests/.
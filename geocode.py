@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Local geocode cache: coordinates for every address are looked up once, kept in SQLite and
+indexed on a grid for radius and bounding-box queries.
+
+    python geocode.py households.csv households-geo.csv --geocoder census
+    python geocode.py households.csv near-poll.csv --geocoder points.csv --near 41.2376 -80.8184 500
+"""
+import argparse
+import io
+import math
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from addresses import normalize_addresses
+from households import normalize_zip
+from voter_ingest import CACHE_DIR
+
+GEOCODE_DB = "geocode.sqlite"
+# SQLite's default limit on bound parameters is 999.
+LOOKUP_BATCH = 900
+
+CENSUS_BATCH_URL = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
+CENSUS_BATCH_SIZE = 10000
+
+EARTH_RADIUS = 6371008.8  # meters
+GRID_METERS = 250
+
+
+def address_keys(df):
+    """
+    The cache key of every row: normalized RESIDENTIAL_ADDRESS1 and five-digit ZIP, e.g.
+    "1256 ARTHUR DR NW|44485". Apartments share their building's coordinates. Rows without
+    an address get "".
+    """
+    street = normalize_addresses(df["RESIDENTIAL_ADDRESS1"])
+    zips = normalize_zip(df["RESIDENTIAL_ZIP"]) if "RESIDENTIAL_ZIP" in df.columns else ""
+    return (street + "|" + zips).where(street != "", "")
+
+
+class GeocodeCache:
+    """
+    address key -> (latitude, longitude) in a SQLite table. Addresses a geocoder could not
+    place are stored with NULL coordinates so they are not sent again.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, GEOCODE_DB)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " address TEXT PRIMARY KEY, latitude REAL, longitude REAL, source TEXT, geocoded_at TEXT)"
+        )
+
+    def lookup(self, keys):
+        """
+        Return a DataFrame indexed by address with latitude and longitude for every key the
+        cache holds (NaN for addresses that could not be placed).
+        """
+        keys = list(dict.fromkeys(k for k in keys if k))
+        rows = []
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            rows += self.db.execute(
+                f"SELECT address, latitude, longitude FROM geocode WHERE address IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+        found = pd.DataFrame(rows, columns=["address", "latitude", "longitude"]).set_index("address")
+        return found.astype("float64")
+
+    def store(self, coordinates, source):
+        """
+        Save {address key: (latitude, longitude) or None} from one geocoder.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)",
+                [(key, *(point or (None, None)), source, now) for key, point in coordinates.items()],
+            )
+
+    def close(self):
+        self.db.close()
+
+
+class FileGeocoder:
+    """
+    Geocoder backed by a local CSV of RESIDENTIAL_ADDRESS1, RESIDENTIAL_ZIP, LATITUDE,
+    LONGITUDE (e.g. a county address-point export), for offline runs and tests.
+    """
+
+    def __init__(self, path):
+        points = pd.read_csv(path, dtype={"RESIDENTIAL_ZIP": str})
+        self.name = f"file:{os.path.basename(path)}"
+        self.points = dict(zip(address_keys(points), zip(points["LATITUDE"], points["LONGITUDE"])))
+
+    def __call__(self, keys):
+        return {key: self.points.get(key) for key in keys}
+
+
+class CensusGeocoder:
+    """
+    Geocoder using the U.S. Census batch endpoint (free, no key, up to 10,000 addresses
+    a request). city and state fill in what the address key does not carry.
+    """
+
+    name = "census"
+
+    def __init__(self, city="WARREN", state="OH", session=None):
+        import requests
+
+        self.city = city
+        self.state = state
+        self.session = session or requests.Session()
+
+    def __call__(self, keys):
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), CENSUS_BATCH_SIZE):
+            batch = keys[start:start + CENSUS_BATCH_SIZE]
+            lines = pd.DataFrame([(i, *key.split("|")) for i, key in enumerate(batch)])
+            lines.insert(2, "city", self.city)
+            lines.insert(3, "state", self.state)
+            response = self.session.post(
+                CENSUS_BATCH_URL,
+                data={"benchmark": "Public_AR_Current"},
+                files={"addressFile": ("addresses.csv", lines.to_csv(index=False, header=False))},
+                timeout=600,
+            )
+            response.raise_for_status()
+            result = pd.read_csv(io.StringIO(response.text), header=None, dtype=str)
+            for _, row in result.iterrows():
+                if row[2] == "Match" and isinstance(row[5], str):
+                    longitude, latitude = (float(v) for v in row[5].split(","))
+                    found[batch[int(row[0])]] = (latitude, longitude)
+        return {key: found.get(key) for key in keys}
+
+
+def add_coordinates(df, cache, geocoder=None):
+    """
+    Return a copy of df with LATITUDE and LONGITUDE right after RESIDENTIAL_ZIP (or at the end).
+    Coordinates come from the cache; when a geocoder is given, addresses the cache has never
+    seen are sent to it once and stored, so later runs make no lookups at all.
+    """
+    keys = address_keys(df)
+    found = cache.lookup(keys.unique())
+    if geocoder is not None:
+        missing = [key for key in keys.unique() if key and key not in found.index]
+        if missing:
+            print(f"Geocoding {len(missing)} new addresses with {geocoder.name}")
+            cache.store(geocoder(missing), geocoder.name)
+            found = cache.lookup(keys.unique())
+
+    out = df.drop(columns=["LATITUDE", "LONGITUDE"], errors="ignore")
+    position = out.columns.get_loc("RESIDENTIAL_ZIP") + 1 if "RESIDENTIAL_ZIP" in out.columns else len(out.columns)
+    out.insert(position, "LATITUDE", keys.map(found["latitude"]).to_numpy(dtype="float64"))
+    out.insert(position + 1, "LONGITUDE", keys.map(found["longitude"]).to_numpy(dtype="float64"))
+    return out
+
+
+class PointIndex:
+    """
+    Grid index over latitude/longitude points. Points are projected to meters around their
+    mean latitude (fine at city scale) and bucketed into GRID_METERS cells, so a query only
+    measures distances to points in the cells it overlaps. Queries return positions into
+    the arrays the index was built from; points without coordinates are never returned.
+    """
+
+    def __init__(self, latitude, longitude, cell_meters=GRID_METERS):
+        self.latitude = np.asarray(latitude, dtype="float64")
+        self.longitude = np.asarray(longitude, dtype="float64")
+        self.cell_meters = cell_meters
+        valid = ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+        self.lat0 = float(np.radians(self.latitude[valid].mean())) if valid.any() else 0.0
+        x, y = self._project(self.latitude, self.longitude)
+
+        positions = np.flatnonzero(valid)
+        cells = np.stack([np.floor(x[valid] / cell_meters), np.floor(y[valid] / cell_meters)], axis=1).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        cells, positions = cells[order], positions[order]
+        unique, starts = np.unique(cells, axis=0, return_index=True)
+        ends = np.append(starts[1:], len(positions))
+        self.cells = {(int(cx), int(cy)): positions[s:e] for (cx, cy), s, e in zip(unique, starts, ends)}
+        self.x, self.y = x, y
+
+    def _project(self, latitude, longitude):
+        latitude = np.radians(np.asarray(latitude, dtype="float64"))
+        longitude = np.radians(np.asarray(longitude, dtype="float64"))
+        return EARTH_RADIUS * longitude * math.cos(self.lat0), EARTH_RADIUS * latitude
+
+    def _candidates(self, x_min, y_min, x_max, y_max):
+        size = self.cell_meters
+        found = [
+            self.cells[(cx, cy)]
+            for cx in range(int(math.floor(x_min / size)), int(math.floor(x_max / size)) + 1)
+            for cy in range(int(math.floor(y_min / size)), int(math.floor(y_max / size)) + 1)
+            if (cx, cy) in self.cells
+        ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def within_radius(self, latitude, longitude, meters):
+        """
+        Positions of the points within meters of (latitude, longitude), nearest first.
+        """
+        x, y = self._project(latitude, longitude)
+        candidates = self._candidates(x - meters, y - meters, x + meters, y + meters)
+        distance = np.hypot(self.x[candidates] - x, self.y[candidates] - y)
+        inside = distance <= meters
+        return candidates[inside][np.argsort(distance[inside], kind="stable")]
+
+    def within_bbox(self, south, west, north, east):
+        """
+        Positions of the points inside the box, in their original order.
+        """
+        x_min, y_min = self._project(south, west)
+        x_max, y_max = self._project(north, east)
+        candidates = self._candidates(x_min, y_min, x_max, y_max)
+        lat, lon = self.latitude[candidates], self.longitude[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(candidates[inside])
+
+
+def near(df, latitude, longitude, meters, index=None):
+    """
+    Rows of df (with LATITUDE/LONGITUDE) within meters of a point, nearest first, with a
+    DISTANCE_M column. Pass a PointIndex built on df to reuse it across queries.
+    """
+    if index is None:
+        index = PointIndex(df["LATITUDE"], df["LONGITUDE"])
+    positions = index.within_radius(latitude, longitude, meters)
+    x, y = index._project(latitude, longitude)
+    rows = df.iloc[positions].copy()
+    rows["DISTANCE_M"] = np.hypot(index.x[positions] - x, index.y[positions] - y).round(1)
+    return rows
+
+
+def make_geocoder(source):
+    """
+    "census" for the Census batch geocoder, a CSV path for FileGeocoder, None for cache only.
+    """
+    if not source:
+        return None
+    if source == "census":
+        return CensusGeocoder()
+    return FileGeocoder(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add cached LATITUDE/LONGITUDE to a voter or household CSV.")
+    parser.add_argument("input_file", help="CSV with RESIDENTIAL_ADDRESS1 and RESIDENTIAL_ZIP")
+    parser.add_argument("output_file", help="CSV to write")
+    parser.add_argument("--geocoder", help="'census' or a CSV of RESIDENTIAL_ADDRESS1, RESIDENTIAL_ZIP, "
+                                           "LATITUDE, LONGITUDE; without it only cached coordinates are used")
+    parser.add_argument("--cache", help=f"SQLite cache file (default: {os.path.join(CACHE_DIR, GEOCODE_DB)})")
+    parser.add_argument("--near", nargs=3, type=float, metavar=("LAT", "LON", "METERS"),
+                        help="keep only rows within METERS of LAT, LON")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input_file, dtype={"SOS_VOTERID": str, "RESIDENTIAL_ZIP": str}, low_memory=False)
+    cache = GeocodeCache(args.cache)
+    try:
+        df = add_coordinates(df, cache, make_geocoder(args.geocoder))
+    finally:
+        cache.close()
+    print(f"{df['LATITUDE'].notna().sum()} of {len(df)} rows have coordinates")
+    if args.near:
+        df = near(df, *args.near)
+        print(f"{len(df)} rows within {args.near[2]:g} m")
+    df.to_csv(args.output_file, index=False)
+    print(f"Written to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
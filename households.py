@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Roll voters up to households, one row per door, for canvassing and Google Maps imports.
+
+    python households.py CityOfWarren2025-02-06-target-googlemaps.csv households.csv
+"""
+import argparse
+
+import pandas as pd
+
+from addresses import normalize_addresses, normalize_units
+from voter_scores import SCORE_COLUMNS
+
+# A household is every voter sharing these three columns, after normalize_addresses / normalize_units.
+HOUSEHOLD_COLUMNS = ["RESIDENTIAL_ADDRESS1", "RESIDENTIAL_SECONDARY_ADDR", "RESIDENTIAL_ZIP"]
+
+# Columns carried over from the household's first voter (when the input has them).
+PLACE_COLUMNS = ["StreetName", "RESIDENTIAL_ADDRESS1", "RESIDENTIAL_SECONDARY_ADDR", "RESIDENTIAL_CITY",
+                 "RESIDENTIAL_STATE", "RESIDENTIAL_ZIP", "PRECINCT_NAME", "WARD"]
+
+MEMBER_SEPARATOR = "; "
+
+
+def normalize_zip(values):
+    """
+    The five-digit ZIP of each value ("44485", 44485, "44485-1234" and "44485.0" all give
+    "44485"); "" when there is none.
+    """
+    values = pd.Series(values, copy=False).astype(object).map(lambda z: "" if pd.isna(z) else str(z))
+    return values.str.extract(r"(\d{5})", expand=False).fillna("")
+
+
+def household_key(df):
+    """
+    One uint64 per voter: a hash of the normalized HOUSEHOLD_COLUMNS (addresses through
+    addresses.normalize_addresses, so "1256-B Arthur Drive N.W." and "1256B ARTHUR DR NW" are
+    one door; secondary addresses through normalize_units, ZIPs through normalize_zip).
+    """
+    parts = []
+    for col in HOUSEHOLD_COLUMNS:
+        if col not in df.columns:
+            parts.append(pd.Series("", index=df.index))
+        elif col == "RESIDENTIAL_ZIP":
+            parts.append(normalize_zip(df[col]))
+        elif col == "RESIDENTIAL_SECONDARY_ADDR":
+            parts.append(normalize_units(df[col]))
+        else:
+            parts.append(normalize_addresses(df[col]))
+    joined = parts[0].str.cat(parts[1:], sep="|")
+    return pd.util.hash_pandas_object(joined, index=False).to_numpy()
+
+
+def build_households(df):
+    """
+    Group voters by household_key (a hash group-by; the result keeps the order in which
+    each door is first seen, so a frame sorted by precinct stays sorted) and return one row
+    per household:
+      HOUSEHOLD_ID, the PLACE_COLUMNS of its first voter, VOTERS, the summed SCORE_COLUMNS
+      (when df is scored), MEMBERS ("LAST FIRST; ...") and MEMBER_IDS (SOS_VOTERIDs).
+    Score columns stay right after WARD, where the voter files have them.
+    """
+    keys = household_key(df)
+    grouped = df.groupby(keys, sort=False)
+
+    households = grouped[[col for col in PLACE_COLUMNS if col in df.columns]].first()
+    households.insert(0, "HOUSEHOLD_ID", [f"{key:016x}" for key in households.index])
+    position = households.columns.get_loc("WARD") + 1 if "WARD" in households.columns else len(households.columns)
+    households.insert(position, "VOTERS", grouped.size())
+    if all(col in df.columns for col in SCORE_COLUMNS):
+        sums = grouped[SCORE_COLUMNS].sum()
+        for offset, col in enumerate(SCORE_COLUMNS, start=1):
+            households.insert(position + offset, col, sums[col].astype("int64"))
+
+    if "LAST_NAME" in df.columns:
+        names = df["LAST_NAME"].astype(object).fillna("").astype(str)
+        if "FIRST_NAME" in df.columns:
+            names = names + " " + df["FIRST_NAME"].astype(object).fillna("").astype(str)
+        households["MEMBERS"] = names.str.strip().groupby(keys, sort=False).agg(MEMBER_SEPARATOR.join)
+    if "SOS_VOTERID" in df.columns:
+        ids = df["SOS_VOTERID"].astype(object).fillna("").astype(str)
+        households["MEMBER_IDS"] = ids.groupby(keys, sort=False).agg(MEMBER_SEPARATOR.join)
+    return households.reset_index(drop=True)
+
+
+def household_members(households):
+    """
+    Map each HOUSEHOLD_ID to the list of SOS_VOTERIDs living there.
+    """
+    return dict(zip(households["HOUSEHOLD_ID"], households["MEMBER_IDS"].str.split(MEMBER_SEPARATOR)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collapse a voter CSV into one row per household.")
+    parser.add_argument("input_file", help="voter CSV, e.g. a googlemaps target file")
+    parser.add_argument("output_file", help="household CSV to write")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input_file, dtype={"SOS_VOTERID": str, "RESIDENTIAL_ZIP": str}, low_memory=False)
+    households = build_households(df)
+    households.to_csv(args.output_file, index=False)
+    print(f"{len(df)} voters in {len(households)} households written to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
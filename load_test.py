@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Load-test a running lookup_server.py: --clients keep-alive connections each send requests
+back to back, cycling through a mix of lookups, and the latency percentiles are reported.
+
+    python load_test.py --clients 50 --requests 5000
+    python load_test.py --clients 50 --requests 5000 --no-cache --paths field-lookups.txt
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from urllib.parse import quote
+
+from lookup_server import DEFAULT_PORT
+
+# A canvassing mix: mostly voter and door lookups, some rollups, the odd target export.
+DEFAULT_PATHS = [
+    "/search?q=toles 1959",
+    "/search?q=who lives at 1256 arthur",
+    "/search?q=rowley howard",
+    "/search?q=kensington",
+    "/household?address=1256 arthur",
+    "/household?address=1408 kensington",
+    "/rollup?level=WARD",
+    "/rollup?level=PRECINCT_NAME&group=WARREN CITY 1A",
+    "/target?rule=Latest >= 1 and Dems >= 2&limit=50",
+]
+
+
+def _encode(path):
+    return quote(path, safe="/?&=")
+
+
+async def _request(reader, writer, path, host, no_cache):
+    extra = "Cache-Control: no-cache\r\n" if no_cache else ""
+    writer.write(f"GET {_encode(path)} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode("latin-1"))
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("server closed the connection without a response")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, paths, count, no_cache, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in itertools.islice(paths, count):
+            start = time.perf_counter()
+            try:
+                status = await _request(reader, writer, path, host, no_cache)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Count the dropped request and carry on over a new connection.
+                errors["closed"] = errors.get("closed", 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, paths, clients, requests, no_cache):
+    latencies, errors = [], {}
+    per_client = [requests // clients + (i < requests % clients) for i in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client(host, port, itertools.cycle(random.sample(paths, len(paths))), count, no_cache, latencies, errors)
+        for count in per_client if count
+    ])
+    return time.perf_counter() - start, latencies, errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running lookup_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections (default: 50)")
+    parser.add_argument("--requests", type=int, default=2000, help="requests in total (default: 2000)")
+    parser.add_argument("--paths", help="file with one request path per line (default: a built-in mix)")
+    parser.add_argument("--no-cache", action="store_true", help="ask the server to bypass its response cache")
+    args = parser.parse_args()
+
+    paths = DEFAULT_PATHS
+    if args.paths:
+        with open(args.paths) as f:
+            paths = [line.strip() for line in f if line.strip()]
+
+    seconds, latencies, errors = asyncio.run(
+        run(args.host, args.port, paths, args.clients, args.requests, args.no_cache))
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients in {seconds:.2f}s "
+          f"({len(latencies) / seconds:.0f} req/s)")
+    if latencies:
+        print(f"latency ms: p50 {percentile(latencies, 0.50) * 1000:.1f}  p95 {percentile(latencies, 0.95) * 1000:.1f}  "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f}  max {latencies[-1] * 1000:.1f}")
+    if errors:
+        print("errors: " + ", ".join(f"{status} x{count}" for status, count in sorted(errors.items(), key=str)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+A small HTTP lookup service for canvassers: the scored voters, their households, the search
+index and the turnout rollups are loaded once, then served as JSON (and CSV for targets).
+
+    python lookup_server.py cache/stage-scored.pkl --port 8080 --rules targets.example.rules
+
+    GET /search?q=toles 1959&limit=20        voters, best match first (with HOUSEHOLD_ID)
+    GET /household?address=1256 arthur        households of the matching voters, with members
+    GET /household?id=2f1c...                 one household by HOUSEHOLD_ID
+    GET /rollup?level=PRECINCT_NAME&group=WARREN CITY 1A[&election=GENERAL-11/05/2024]
+    GET /target?name=latest_dems[&format=csv] a rule from --rules, or ?rule=Latest >= 1 and Dems >= 2
+    GET /health
+
+Requests are handled concurrently on one asyncio loop; the pandas work runs on a thread pool.
+Responses are kept in an LRU cache (send "Cache-Control: no-cache" to bypass it), and identical
+requests arriving together are computed once.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from households import build_households, household_key
+from rollups import build_rollups, turnout_table
+from targeting import RuleError, TargetEngine, load_scored, maps_frame, read_rules
+from voter_search import VoterSearchIndex
+
+DEFAULT_PORT = 8080
+# Responses kept by the cache, and the most bytes they may take together.
+CACHE_ENTRIES = 1024
+CACHE_BYTES = 64 * 1024 * 1024
+# Rule sub-expression masks kept by the target engine (one bool per voter each), so ad-hoc
+# /target?rule= requests cannot grow memory without bound.
+MASK_CACHE_ENTRIES = 256
+# Seconds an idle keep-alive connection is kept open.
+IDLE_TIMEOUT = 15
+MAX_LIMIT = 500
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _limit(params, default=20):
+    try:
+        return max(1, min(int(params.get("limit", default)), MAX_LIMIT))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "limit must be a number") from None
+
+
+class VoterModel:
+    """
+    Everything the service answers from, built once at start-up from a scored voter frame.
+    """
+
+    def __init__(self, df, rules=None):
+        start = time.perf_counter()
+        df = df.reset_index(drop=True)
+        df.insert(0, "HOUSEHOLD_ID", [f"{key:016x}" for key in household_key(df)])
+        self.df = df
+        self.households = build_households(df).set_index("HOUSEHOLD_ID", drop=False)
+        self.index = VoterSearchIndex.build(df)
+        self.index.results.insert(0, "HOUSEHOLD_ID", df["HOUSEHOLD_ID"])
+        self.turnout = {level: turnout_table(df, counts, level) for level, counts in build_rollups(df).items()}
+        self.engine = TargetEngine(df, max_masks=MASK_CACHE_ENTRIES)
+        self.rules = rules or {}
+        print(f"Loaded {len(df)} voters in {len(self.households)} households "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    def search(self, params):
+        query = params.get("q", "").strip()
+        if not query:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "q is required")
+        return {"query": query, "voters": _records(self.index.search(query, _limit(params)))}
+
+    def household(self, params):
+        if "id" in params:
+            ids = [params["id"].lower()]
+            if ids[0] not in self.households.index:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No household {params['id']}")
+        elif params.get("address", "").strip():
+            # Households in the order their best-matching voter ranks.
+            voters = self.index.search(params["address"], MAX_LIMIT)
+            ids = list(dict.fromkeys(voters["HOUSEHOLD_ID"]))[:_limit(params, 10)]
+        else:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "id or address is required")
+        households = self.households.loc[ids]
+        members = self.df[self.df["HOUSEHOLD_ID"].isin(ids)]
+        result = _records(households)
+        for household in result:
+            rows = members[members["HOUSEHOLD_ID"] == household["HOUSEHOLD_ID"]]
+            household["voters"] = _records(self.index.results.loc[rows.index])
+        return {"households": result}
+
+    def rollup(self, params):
+        level = params.get("level", "PRECINCT_NAME")
+        if level not in self.turnout:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"level must be one of {', '.join(self.turnout)}")
+        table = self.turnout[level]
+        if "group" in params:
+            table = table[table[level] == params["group"]]
+        if "election" in params:
+            table = table[table["ELECTION"] == params["election"]]
+        return {"level": level, "rows": _records(table)}
+
+    def target(self, params):
+        if "name" in params:
+            if params["name"] not in self.rules:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No rule named {params['name']}")
+            expression = self.rules[params["name"]]
+        elif params.get("rule", "").strip():
+            expression = params["rule"]
+        else:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "name or rule is required")
+        try:
+            voters = maps_frame(self.df[self.engine.mask(expression)])
+        except RuleError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e)) from None
+        if params.get("format") == "csv":
+            return voters.to_csv(index=False)
+        return {"rule": expression, "count": len(voters), "voters": _records(voters.head(_limit(params, MAX_LIMIT)))}
+
+    def health(self, params):
+        return {"voters": len(self.df), "households": len(self.households), "rules": list(self.rules)}
+
+
+class ResponseCache:
+    """
+    LRU cache of encoded responses, bounded by entry count and total bytes.
+    """
+
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        response = self.entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return response
+
+    def put(self, key, response):
+        if len(response[2]) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key)[2])
+        self.entries[key] = response
+        self.size += len(response[2])
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            self.size -= len(self.entries.popitem(last=False)[1][2])
+
+
+class LookupServer:
+    def __init__(self, model, workers=4, cache=None):
+        self.model = model
+        self.routes = {"/search": model.search, "/household": model.household, "/rollup": model.rollup,
+                       "/target": model.target, "/health": model.health}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = cache or ResponseCache()
+        self.pending = {}
+
+    def respond(self, path, params):
+        """
+        (status, content type, body) for one request; runs on the thread pool.
+        """
+        route = self.routes.get(path)
+        if route is None:
+            return HTTPStatus.NOT_FOUND, "application/json", json.dumps({"error": f"No such endpoint {path}"}).encode()
+        try:
+            result = route(params)
+            if isinstance(result, str):
+                return HTTPStatus.OK, "text/csv; charset=utf-8", result.encode()
+            return HTTPStatus.OK, "application/json", json.dumps(result).encode()
+        except RequestError as e:
+            return e.status, "application/json", json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            # Anything unexpected still gets an answer, and the connection stays usable.
+            print(f"Error answering {path} {params}: {e!r}")
+            return (HTTPStatus.INTERNAL_SERVER_ERROR, "application/json",
+                    json.dumps({"error": f"{type(e).__name__}: {e}"}).encode())
+
+    async def lookup(self, target, use_cache):
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        key = (url.path.rstrip("/") or "/", tuple(sorted(params.items())))
+        if use_cache and key[0] != "/health":
+            response = self.cache.get(key)
+            if response is not None:
+                return response
+        # Identical requests already being computed share the result.
+        if key not in self.pending:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self.respond, key[0], params)
+            future.add_done_callback(lambda done: self.pending.pop(key, None))
+            self.pending[key] = future
+        response = await asyncio.shield(self.pending[key])
+        if response[0] == HTTPStatus.OK and key[0] != "/health":
+            self.cache.put(key, response)
+        return response
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send(writer, (HTTPStatus.BAD_REQUEST, "text/plain", b"Bad request"), False)
+                    break
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if method != "GET":
+                    response = (HTTPStatus.METHOD_NOT_ALLOWED, "text/plain", b"Only GET is supported")
+                else:
+                    response = await self.lookup(target, "no-cache" not in headers.get("cache-control", ""))
+                await self.send(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, response, keep_alive):
+        status, content_type, body = response
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, backlog=256)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def load_model(path, rules_file=None):
+    """
+    A VoterModel from a pipeline stage pickle (cache/stage-scored.pkl), a scored CSV or a
+    county .txt file.
+    """
+    df = pd.read_pickle(path) if path.endswith(".pkl") else load_scored(path)
+    return VoterModel(df, read_rules(rules_file) if rules_file else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve voter, household, rollup and target lookups over HTTP.")
+    parser.add_argument("input_file", help="cache/stage-scored.pkl, a scored voter CSV or a county .txt file")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole network)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--rules", help="rule file whose targets /target?name= serves (see targets.example.rules)")
+    parser.add_argument("--workers", type=int, default=4, help="threads used to answer requests")
+    parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="responses kept in the cache")
+    args = parser.parse_args()
+
+    model = load_model(args.input_file, args.rules)
+    server = LookupServer(model, args.workers, ResponseCache(args.cache_entries))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"Stopped; cache hits {server.cache.hits}, misses {server.cache.misses}")
+
+
+if __name__ == '__main__':
+    main()
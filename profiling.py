@@ -0,0 +1,145 @@
+"""
+Stage timing for the pipeline scripts: wall time, CPU time, memory and row counts per
+stage and per written file, saved as a JSON and CSV trace; plus an optional cProfile dump
+of every file writer call.
+"""
+import cProfile
+import csv
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# rss_delta_mb is what a stage or file left resident (RSS after minus RSS before);
+# process_peak_rss_mb is the process's lifetime high-water mark when the stage ended, which
+# only moves when a stage sets a new peak (and which forked writers inherit from the parent).
+TRACE_FIELDS = ["stage", "wall_seconds", "cpu_seconds", "rss_delta_mb", "process_peak_rss_mb", "rows", "detail"]
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process right now in MB, None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+
+
+def rss_delta_mb(before):
+    """
+    Change in resident set size since before (a current_rss_mb() value), None when unknown.
+    """
+    after = current_rss_mb()
+    return None if before is None or after is None else round(after - before, 1)
+
+
+def peak_rss_mb(children=False):
+    """
+    Lifetime peak resident set size of this process (or the largest of its finished child
+    processes) in MB, None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is KB on Linux and bytes on macOS.
+    scale = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    return round(usage.ru_maxrss / scale, 1)
+
+
+class StageProfiler:
+    """
+    Records one trace row per stage. Disabled profilers cost nothing but the context manager.
+
+        profiler = StageProfiler(enabled=args.profile)
+        with profiler.stage("score") as stage:
+            df = add_scores(df)
+            stage["rows"] = len(df)
+        profiler.write("profile-2025-02-06")
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.records = []
+        self.started = datetime.now().isoformat(timespec="seconds")
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        record = {"stage": name, "rows": rows, "detail": None}
+        wall, cpu = time.perf_counter(), time.process_time()
+        rss = current_rss_mb() if self.enabled else None
+        try:
+            yield record
+        finally:
+            if self.enabled:
+                record["wall_seconds"] = round(time.perf_counter() - wall, 4)
+                record["cpu_seconds"] = round(time.process_time() - cpu, 4)
+                record["rss_delta_mb"] = rss_delta_mb(rss)
+                record["process_peak_rss_mb"] = peak_rss_mb()
+                self.records.append(record)
+
+    def add_files(self, timings):
+        """
+        Add the per-file rows returned by export_wards (each written in its own process
+        when workers > 1, so CPU and the RSS change are the writing process's).
+        """
+        if not self.enabled:
+            return
+        for label, filename, rows, seconds, cpu_seconds, rss in timings:
+            self.records.append({"stage": f"write:{label}", "wall_seconds": round(seconds, 4),
+                                 "cpu_seconds": round(cpu_seconds, 4), "rss_delta_mb": rss,
+                                 "rows": rows, "detail": filename})
+
+    def write(self, prefix):
+        """
+        Write prefix.json (run metadata and stages) and prefix.csv (stages only).
+        """
+        if not self.enabled:
+            return
+        trace = {"started": self.started, "argv": sys.argv, "children_peak_rss_mb": peak_rss_mb(children=True),
+                 "stages": [{field: record.get(field) for field in TRACE_FIELDS} for record in self.records]}
+        with open(f"{prefix}.json", "w") as f:
+            json.dump(trace, f, indent=1)
+        with open(f"{prefix}.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TRACE_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.records)
+        print(f"Profile written to {prefix}.json and {prefix}.csv")
+        for record in self.records:
+            memory = "" if record.get("rss_delta_mb") is None else f"  {record['rss_delta_mb']:+.1f} MB RSS change"
+            print(f"  {record['stage']:<24} {record['wall_seconds']:8.2f}s wall {record['cpu_seconds']:8.2f}s cpu"
+                  f"{memory}  rows={record['rows']}")
+
+
+class ProfiledWriter:
+    """
+    Wraps a file writer (writer(df, filename)) so every call runs under cProfile and leaves
+    {dump_dir}/{file}.prof plus a .txt of the top functions by cumulative time. Picklable
+    when writer is a module-level function, so it works with export_wards' process pool.
+    """
+
+    def __init__(self, writer, dump_dir, top=30):
+        self.writer = writer
+        self.dump_dir = dump_dir
+        self.top = top
+
+    def __call__(self, df, filename):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(self.writer, df, filename)
+        finally:
+            dump = os.path.join(self.dump_dir, os.path.basename(filename) + ".prof")
+            profile.dump_stats(dump)
+            with open(dump[:-len(".prof")] + ".txt", "w") as f:
+                pstats.Stats(dump, stream=f).sort_stats("cumulative").print_stats(self.top)
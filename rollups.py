@@ -0,0 +1,191 @@
+"""
+Turnout and score rollups per WARD and PRECINCT_NAME, kept as small materialized tables so
+dashboards never reload the voter files.
+
+Ballot counts (VOTED, D, R per group and election) come from one pass over the encoded vote
+matrix. They are additive, so a new snapshot only needs the voters its delta mentions
+subtracted (old rows) and added back (new rows).
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from vote_history import BLANK, VoteHistory
+from voter_ingest import CACHE_DIR
+from voter_schema import header_schema
+from voter_scores import SCORE_COLUMNS
+
+ROLLUP_LEVELS = ["WARD", "PRECINCT_NAME"]
+KEY = "SOS_VOTERID"
+# Rows of the vote matrix counted at a time; bounds the temporary index array.
+CHUNK_ROWS = 50000
+
+
+def _groups(df, by):
+    return df[by].astype(object).fillna("").astype(str)
+
+
+def ballot_counts(df, by, history=None):
+    """
+    VOTED (nonblank), D and R ballots per (group, election), indexed by (by, "ELECTION").
+    Every cell of the vote matrix is binned once with np.bincount.
+    """
+    if history is None:
+        history = VoteHistory.from_frame(df)
+    codes, names = pd.factorize(_groups(df, by))
+    n_groups, n_elections = len(names), len(history.elections)
+
+    # Cell classes: 0 blank, 1 D, 2 R, 3 any other ballot.
+    classes = np.full(len(history.labels), 3, dtype=np.int64)
+    classes[BLANK] = 0
+    classes[history.labels.index("D")] = 1
+    classes[history.labels.index("R")] = 2
+
+    cube = np.zeros(n_groups * n_elections * 4, dtype=np.int64)
+    offsets = np.arange(n_elections, dtype=np.int64) * 4
+    for start in range(0, len(df), CHUNK_ROWS):
+        block = history.codes[start:start + CHUNK_ROWS]
+        group = codes[start:start + CHUNK_ROWS].astype(np.int64)[:, None] * (n_elections * 4)
+        cube += np.bincount((group + offsets + classes[block]).ravel(), minlength=cube.size)
+    cube = cube.reshape(n_groups, n_elections, 4)
+
+    index = pd.MultiIndex.from_product([names, list(history.elections["column"])], names=[by, "ELECTION"])
+    return pd.DataFrame({
+        "VOTED": cube[:, :, 1:].sum(axis=2).ravel(),
+        "D": cube[:, :, 1].ravel(),
+        "R": cube[:, :, 2].ravel(),
+    }, index=index)
+
+
+def build_levels(df):
+    return [level for level in ROLLUP_LEVELS if level in df.columns]
+
+
+def build_rollups(df):
+    """
+    {level: ballot_counts} for every ROLLUP_LEVELS column df has, sharing one VoteHistory.
+    """
+    history = VoteHistory.from_frame(df)
+    return {level: ballot_counts(df, level, history) for level in build_levels(df)}
+
+
+def update_rollups(rollups, previous, new, delta):
+    """
+    Bring rollups built on previous up to date with new, touching only the voters in delta
+    (see voter_diff.diff_snapshots). Rebuilt from scratch when an election column was dropped.
+    """
+    old_elections = {e.column for e in header_schema(previous.columns).elections}
+    new_elections = {e.column for e in header_schema(new.columns).elections}
+    if not old_elections <= new_elections or set(rollups) != set(build_levels(new)):
+        return build_rollups(new)
+
+    changed = delta[KEY].unique()
+    old_rows = previous[previous[KEY].isin(changed)]
+    new_rows = new[new[KEY].isin(changed)]
+    old_history = VoteHistory.from_frame(old_rows)
+    new_history = VoteHistory.from_frame(new_rows)
+    updated = {}
+    for level, counts in rollups.items():
+        counts = counts.sub(ballot_counts(old_rows, level, old_history), fill_value=0)
+        counts = counts.add(ballot_counts(new_rows, level, new_history), fill_value=0)
+        updated[level] = counts.astype("int64").sort_index()
+    return updated
+
+
+def turnout_table(df, counts, by):
+    """
+    Long turnout table for one level: group, ELECTION, TYPE, DATE, VOTERS (current
+    registrants in the group), VOTED, D, R and TURNOUT (VOTED / VOTERS). Turnout is measured
+    against today's voter list, since past registrants are not in the file.
+    """
+    voters = _groups(df, by).value_counts().rename("VOTERS")
+    elections = {e.column: e for e in header_schema(df.columns).elections}
+    table = counts.reset_index()
+    table = table[table["ELECTION"].isin(elections)]
+    table.insert(2, "TYPE", table["ELECTION"].map(lambda col: elections[col].type))
+    table.insert(3, "DATE", table["ELECTION"].map(lambda col: elections[col].date.isoformat()))
+    table.insert(4, "VOTERS", table[by].map(voters).fillna(0).astype("int64"))
+    table["TURNOUT"] = (table["VOTED"] / table["VOTERS"].where(table["VOTERS"] > 0)).round(3)
+    return table.sort_values([by, "DATE"]).reset_index(drop=True)
+
+
+def score_distribution(df, by):
+    """
+    Per group and score column: VOTERS, NONZERO (voters with a score above 0), MEAN and the
+    quartiles P25, MEDIAN, P75, plus MAX.
+    """
+    groups = _groups(df, by)
+    parts = []
+    for col in SCORE_COLUMNS:
+        scores = df[col].groupby(groups, sort=True)
+        parts.append(pd.DataFrame({
+            "SCORE": col,
+            "VOTERS": scores.size(),
+            "NONZERO": (df[col] > 0).groupby(groups, sort=True).sum(),
+            "MEAN": scores.mean().round(2),
+            "P25": scores.quantile(0.25),
+            "MEDIAN": scores.median(),
+            "P75": scores.quantile(0.75),
+            "MAX": scores.max(),
+        }))
+    # Stable sort keeps the SCORE_COLUMNS order within each group.
+    table = pd.concat(parts).rename_axis(by).reset_index()
+    return table.sort_values(by, kind="stable").reset_index(drop=True)
+
+
+def write_summary(df, rollups, prefix):
+    """
+    Write {prefix}-summary.xlsx (per level: turnout by group and election, one column per
+    election, and the score distribution) and {prefix}-turnout.csv / {prefix}-scores.csv
+    with the long tables. Returns the xlsx filename.
+    """
+    turnout = {level: turnout_table(df, counts, level) for level, counts in rollups.items()}
+    scores = {level: score_distribution(df, level) for level in rollups if all(c in df.columns for c in SCORE_COLUMNS)}
+
+    election_order = [e.column for e in header_schema(df.columns).elections]
+    filename = f"{prefix}-summary.xlsx"
+    with pd.ExcelWriter(filename, engine="openpyxl") as writer:
+        for level, table in turnout.items():
+            wide = table.pivot(index=[level, "VOTERS"], columns="ELECTION", values="TURNOUT")
+            wide = wide[[col for col in election_order if col in wide.columns]]
+            wide.reset_index().to_excel(writer, sheet_name=f"{level} turnout"[:31], index=False)
+        for level, table in scores.items():
+            table.to_excel(writer, sheet_name=f"{level} scores"[:31], index=False)
+
+    pd.concat([t.rename(columns={level: "GROUP"}).assign(LEVEL=level) for level, t in turnout.items()]) \
+        .to_csv(f"{prefix}-turnout.csv", index=False)
+    if scores:
+        pd.concat([t.rename(columns={level: "GROUP"}).assign(LEVEL=level) for level, t in scores.items()]) \
+            .to_csv(f"{prefix}-scores.csv", index=False)
+    print(f"Summary written to {filename}")
+    return filename
+
+
+def save_rollups(rollups, name, snapshot=None, cache_dir=CACHE_DIR):
+    """
+    Keep rollups under name, tagged with the id of the snapshot they were counted from
+    (see voter_diff.save_snapshot).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"rollups-{name}.pkl")
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump({"snapshot": snapshot, "rollups": rollups}, f)
+    os.replace(path + ".tmp", path)
+
+
+def load_rollups(name, snapshot=None, cache_dir=CACHE_DIR):
+    """
+    The rollups saved under name, or None when there are none or they were counted from a
+    different snapshot than snapshot: a delta only applies to the counts of the snapshot
+    it was taken against.
+    """
+    path = os.path.join(cache_dir, f"rollups-{name}.pkl")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        saved = pickle.load(f)
+    if not isinstance(saved, dict) or "snapshot" not in saved or saved["snapshot"] != snapshot:
+        return None
+    return saved["rollups"]
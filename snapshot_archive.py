@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+An append-only archive of SOS downloads. The first download is stored whole and every later
+one as a cell-level delta against the one before it (SOS_VOTERID, COLUMN, OLD, NEW), all as
+zstd-compressed Parquet, so the archive grows with what changed rather than with the county.
+A full checkpoint is written every CHECKPOINT_EVERY downloads to keep rebuilds short.
+
+    python snapshot_archive.py add downloads/county-78.txt --date 2025-02-06
+    python snapshot_archive.py as-of 2025-02-05 --ward "WARREN-WARD 3" --output ward3-2025-02-05.csv
+    python snapshot_archive.py changes VOTER_STATUS --since 2025-01-01
+    python snapshot_archive.py info
+"""
+import argparse
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from voter_diff import KEY
+from voter_ingest import apply_voter_types
+
+ARCHIVE_DIR = os.path.join(os.getcwd(), "archive")
+MANIFEST = "manifest.json"
+# Downloads between full checkpoints; a rebuild applies at most this many deltas.
+CHECKPOINT_EVERY = 30
+COMPRESSION = "zstd"
+
+# Kinds of delta row: a changed cell of a voter in both downloads, a cell of a new voter,
+# and a voter no longer in the file (one row, COLUMN empty).
+DELTA_KINDS = ["changed", "added", "removed"]
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def read_text_snapshot(path):
+    """
+    An SOS county file with every column as text (blanks as missing) and names trimmed and
+    upper-case: the form the archive stores and returns.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    df.columns = df.columns.str.strip().str.upper()
+    return df
+
+
+def _text(values):
+    """
+    Object array of the values as str, None where missing.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.strftime("%Y-%m-%d")
+    out = np.array(values.to_numpy(dtype=object, na_value=None), dtype=object)
+    # Text columns (the usual case) are taken as they are; anything else is converted per value.
+    if not pd.api.types.is_string_dtype(values.dtype) or pd.api.types.infer_dtype(out, skipna=True) != "string":
+        present = ~pd.isna(out)
+        out[present] = [str(v) for v in out[present]]
+    return out
+
+
+def diff_cells(old, new):
+    """
+    The cell-level delta from old to new (frames keyed by unique SOS_VOTERID, text values):
+    KIND, SOS_VOTERID, COLUMN, OLD, NEW, one row per changed cell, per non-blank cell of an
+    added voter and per removed voter.
+    """
+    old_ids = old[KEY].to_numpy(dtype=object)
+    new_ids = new[KEY].to_numpy(dtype=object)
+    old_position = pd.Index(old_ids).get_indexer(new_ids)
+    common = old_position >= 0
+    removed = ~pd.Index(old_ids).isin(new_ids)
+
+    parts = [pd.DataFrame({"KIND": "removed", KEY: old_ids[removed], "COLUMN": None, "OLD": None, "NEW": None})]
+    for col in new.columns:
+        if col == KEY:
+            continue
+        new_values = _text(new[col])
+        if col in old.columns:
+            old_values = _text(old[col])[old_position[common]]
+        else:
+            old_values = np.full(common.sum(), None, dtype=object)
+        current = new_values[common]
+        # Two blanks are equal; None != "x" and "x" != "y" are changes.
+        changed = (pd.isna(old_values) != pd.isna(current)) | (
+            ~pd.isna(current) & (old_values.astype(str) != current.astype(str)))
+        if changed.any():
+            parts.append(pd.DataFrame({"KIND": "changed", KEY: new_ids[common][changed], "COLUMN": col,
+                                       "OLD": old_values[changed], "NEW": current[changed]}))
+        added = ~common & ~pd.isna(new_values)
+        if added.any():
+            parts.append(pd.DataFrame({"KIND": "added", KEY: new_ids[added], "COLUMN": col,
+                                       "OLD": None, "NEW": new_values[added]}))
+    # Columns dropped from the file: every old value is cleared for the voters still there.
+    for col in old.columns:
+        if col not in new.columns:
+            old_values = _text(old[col])[old_position[common]]
+            cleared = ~pd.isna(old_values)
+            parts.append(pd.DataFrame({"KIND": "changed", KEY: new_ids[common][cleared], "COLUMN": col,
+                                       "OLD": old_values[cleared], "NEW": None}))
+    delta = pd.concat(parts, ignore_index=True)
+    for col in ["KIND", "COLUMN"]:
+        delta[col] = delta[col].astype("category")
+    return delta
+
+
+def apply_delta(state, delta, columns):
+    """
+    state ({column: object array}, SOS_VOTERID included) moved forward by delta, with the
+    columns the newer download had. Arrays of columns the delta does not touch are reused,
+    so a chain of small deltas costs little more than reading the checkpoint.
+    """
+    ids = state[KEY]
+    kept = ~pd.Index(ids).isin(delta.loc[delta["KIND"] == "removed", KEY])
+    new_ids = delta.loc[delta["KIND"] == "added", KEY].unique()
+    resize = not kept.all() or len(new_ids)
+    if resize:
+        ids = np.concatenate([ids[kept], new_ids])
+
+    out = {}
+    for col in columns:
+        values = state.get(col)
+        if values is None:
+            values = np.full(len(kept), None, dtype=object)
+        out[col] = np.concatenate([values[kept], np.full(len(new_ids), None, dtype=object)]) if resize else values
+    out[KEY] = ids
+    position = pd.Index(ids)
+    cells = delta[delta["KIND"] != "removed"]
+    for col, group in cells.groupby("COLUMN", observed=True, sort=False):
+        if col in out:
+            if out[col] is state.get(col):
+                out[col] = out[col].copy()
+            out[col][position.get_indexer(group[KEY])] = group["NEW"].to_numpy(dtype=object)
+    return out
+
+
+class SnapshotArchive:
+    """
+    One directory of Parquet files plus manifest.json listing every download in date order:
+    {"date", "file", "kind" ("full" or "delta"), "columns", "rows", "cells"}.
+    Files are only ever added.
+    """
+
+    def __init__(self, path=None, checkpoint_every=CHECKPOINT_EVERY):
+        self.path = path or ARCHIVE_DIR
+        self.checkpoint_every = checkpoint_every
+        os.makedirs(self.path, exist_ok=True)
+        manifest = os.path.join(self.path, MANIFEST)
+        self.versions = []
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.versions = json.load(f)["versions"]
+
+    def _save_manifest(self):
+        manifest = os.path.join(self.path, MANIFEST)
+        with open(manifest + ".tmp", "w") as f:
+            json.dump({"versions": self.versions}, f, indent=1)
+        os.replace(manifest + ".tmp", manifest)
+
+    def _write(self, df, name):
+        df.to_parquet(os.path.join(self.path, name + ".tmp"), index=False, compression=COMPRESSION)
+        os.replace(os.path.join(self.path, name + ".tmp"), os.path.join(self.path, name))
+
+    def dates(self):
+        return [version["date"] for version in self.versions]
+
+    def add(self, df, download_date):
+        """
+        Append a download (a text frame, see read_text_snapshot) taken on download_date.
+        Dates must increase; a download identical to the last one is recorded with an empty delta.
+        """
+        download_date = _iso(download_date)
+        if self.versions and download_date <= self.versions[-1]["date"]:
+            raise ArchiveError(f"{download_date} is not after the last download ({self.versions[-1]['date']})")
+        df = df[df[KEY].notna()].drop_duplicates(KEY, keep="last").reset_index(drop=True)
+        since_full = next((i for i, v in enumerate(reversed(self.versions)) if v["kind"] == "full"), None)
+
+        if since_full is None or since_full + 1 >= self.checkpoint_every:
+            name, kind, cells = f"full-{download_date}.parquet", "full", None
+            self._write(pd.DataFrame({col: _text(df[col]) for col in df.columns}), name)
+        else:
+            delta = diff_cells(self.as_of(self.versions[-1]["date"]), df)
+            name, kind, cells = f"delta-{download_date}.parquet", "delta", len(delta)
+            self._write(delta, name)
+        self.versions.append({"date": download_date, "file": name, "kind": kind,
+                              "columns": list(df.columns), "rows": len(df), "cells": cells})
+        self._save_manifest()
+        size = os.path.getsize(os.path.join(self.path, name))
+        print(f"Archived {download_date}: {kind}, {len(df)} voters"
+              + (f", {cells} changed cells" if cells is not None else "") + f", {size / 1e6:.2f} MB")
+        return name
+
+    def as_of(self, when, typed=False):
+        """
+        The voter file as it was on when (the last download on or before it), rebuilt from
+        the nearest checkpoint. Text columns unless typed (see voter_ingest.apply_voter_types).
+        """
+        when = _iso(when)
+        upto = [i for i, v in enumerate(self.versions) if v["date"] <= when]
+        if not upto:
+            raise ArchiveError(f"No download on or before {when}")
+        last = upto[-1]
+        first = max(i for i in upto if self.versions[i]["kind"] == "full")
+        full = pd.read_parquet(os.path.join(self.path, self.versions[first]["file"]))
+        if first == last:
+            return apply_voter_types(full) if typed else full
+        state = {col: _text(full[col]) for col in full.columns}
+        for version in self.versions[first + 1:last + 1]:
+            delta = pd.read_parquet(os.path.join(self.path, version["file"]))
+            state = apply_delta(state, delta, version["columns"])
+        df = pd.DataFrame(state, columns=self.versions[last]["columns"])
+        return apply_voter_types(df) if typed else df
+
+    def changes(self, column, since, until=None):
+        """
+        Every change to column after since (and on or before until): DATE, SOS_VOTERID, OLD,
+        NEW. Read from the deltas alone; voters added or removed are not included.
+        """
+        since, until = _iso(since), _iso(until) if until else None
+        parts = []
+        for version in self.versions:
+            if version["kind"] != "delta" or version["date"] <= since or (until and version["date"] > until):
+                continue
+            delta = pd.read_parquet(os.path.join(self.path, version["file"]),
+                                    filters=[("COLUMN", "==", column), ("KIND", "==", "changed")])
+            parts.append(delta[[KEY, "OLD", "NEW"]].assign(DATE=version["date"]))
+        if not parts:
+            return pd.DataFrame(columns=["DATE", KEY, "OLD", "NEW"])
+        return pd.concat(parts, ignore_index=True)[["DATE", KEY, "OLD", "NEW"]]
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.path, v["file"])) for v in self.versions)
+
+
+def _iso(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append-only archive of SOS downloads with time-travel queries.")
+    parser.add_argument("--archive", help=f"archive directory (default: {ARCHIVE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="archive a county file")
+    add.add_argument("county_file")
+    add.add_argument("--date", help="download date, YYYY-MM-DD (default: the file's modification date)")
+
+    as_of = commands.add_parser("as-of", help="rebuild the file as of a date")
+    as_of.add_argument("date")
+    as_of.add_argument("--ward", help="keep rows whose WARD contains this, e.g. 'WARREN-WARD 3'")
+    as_of.add_argument("--output", help="csv or xlsx file to write (default: print a summary)")
+
+    changes = commands.add_parser("changes", help="changes to one column since a date")
+    changes.add_argument("column", help="e.g. VOTER_STATUS")
+    changes.add_argument("--since", required=True)
+    changes.add_argument("--until")
+    changes.add_argument("--output", help="csv file to write (default: print)")
+
+    commands.add_parser("info", help="list the archived downloads")
+    args = parser.parse_args()
+
+    archive = SnapshotArchive(args.archive)
+    try:
+        if args.command == "add":
+            when = args.date or date.fromtimestamp(os.path.getmtime(args.county_file))
+            archive.add(read_text_snapshot(args.county_file), when)
+        elif args.command == "as-of":
+            df = archive.as_of(args.date)
+            if args.ward:
+                df = df[df["WARD"].str.contains(args.ward, case=False, na=False, regex=False)]
+            if args.output:
+                from voter_store import export_frame
+
+                export_frame(df, args.output)
+            else:
+                print(f"{len(df)} voters as of {args.date}")
+                if "WARD" in df.columns:
+                    print(df["WARD"].value_counts().sort_index().to_string())
+        elif args.command == "changes":
+            df = archive.changes(args.column.upper(), args.since, args.until)
+            if args.output:
+                df.to_csv(args.output, index=False)
+                print(f"{len(df)} changes written to {args.output}")
+            else:
+                print(df.to_string(index=False) if len(df) else "No changes")
+        else:
+            for v in archive.versions:
+                print(f"{v['date']}  {v['kind']:<5}  {v['rows']:>8} voters  "
+                      f"{'' if v['cells'] is None else str(v['cells']) + ' cells':>14}  {v['file']}")
+            print(f"{len(archive.versions)} downloads, {archive.size() / 1e6:.2f} MB")
+    except ArchiveError as e:
+        print(e)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import os
+import shutil
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Ohio SOS voter file pages. Each county is a "product"; TRUMBULL is 78.
+SOS_HOME_URL = "https://www6.ohiosos.gov/ords/f?p=VOTERFTP:HOME::::::"
+SOS_COUNTY_URL = "https://www6.ohiosos.gov/ords/f?p=VOTERFTP:DOWNLOAD::FILE:NO:2:P2_PRODUCT_NUMBER:{product}"
+TRUMBULL = 78
+
+# Browser-like headers; the SOS site answers plain library requests with a 403.
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9,ja;q=0.8"
+}
+
+# Every SOS voter file starts with this column.
+EXPECTED_HEADER = b"SOS_VOTERID"
+
+TIMEOUT = 60  # seconds
+BLOCK_SIZE = 1 << 20
+ATTEMPTS = 3
+POOL_SIZE = 8
+
+
+class IncompleteDownload(Exception):
+    pass
+
+
+def open_session(home_url=SOS_HOME_URL, pool_size=POOL_SIZE):
+    """
+    Return a requests session with the browser headers and a connection pool large enough
+    for concurrent downloads, warmed up by visiting the HOME page so it carries the site's
+    cookies. Pass home_url=None to skip the warm-up.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if home_url:
+        response = session.get(home_url, timeout=TIMEOUT)
+        response.raise_for_status()
+    return session
+
+
+def _validator(response):
+    """
+    The response's strong ETag, or else its Last-Modified date: the value If-Range accepts.
+    """
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _discard_part(part_path):
+    for path in (part_path, part_path + ".validator"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _transfer(session, url, part_path):
+    """
+    Fetch url into part_path, resuming from whatever part_path already holds with a Range
+    request. Returns the expected total size, or None when the server does not say.
+    The county files are regenerated daily, so a part file is only resumed under If-Range
+    with the ETag/Last-Modified it was started with (kept in part_path.validator); when the
+    file has changed since, or there is no validator to check, the download starts over.
+    """
+    validator_path = part_path + ".validator"
+    validator = None
+    if os.path.exists(validator_path):
+        with open(validator_path) as f:
+            validator = f.read().strip() or None
+    if os.path.exists(part_path) and not validator:
+        _discard_part(part_path)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # Ask for the raw bytes so Range offsets and Content-Length refer to what lands on disk.
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if offset and (response.status_code == 416
+                       or (response.status_code == 206 and _validator(response) not in (None, validator))):
+            # A part that no longer lines up with the file on the server; fetch it all again.
+            response.close()
+            _discard_part(part_path)
+            return _transfer(session, url, part_path)
+        response.raise_for_status()
+        if response.status_code == 206:
+            mode = "ab"
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            total = int(total) if total.isdigit() else None
+        else:
+            # A full body: the server ignored the Range or the file changed; start over.
+            mode = "wb"
+            length = response.headers.get("Content-Length")
+            total = int(length) if length else None
+            with open(validator_path, "w") as f:
+                f.write(_validator(response) or "")
+        with open(part_path, mode) as f:
+            for block in response.iter_content(BLOCK_SIZE):
+                f.write(block)
+    return total
+
+
+def verify_download(path, expected_size=None):
+    """
+    Raise IncompleteDownload unless path has the expected size (when known), and
+    ValueError unless it starts with the SOS header rather than, say, an HTML error page.
+    """
+    size = os.path.getsize(path)
+    if expected_size is not None and size != expected_size:
+        raise IncompleteDownload(f"{path} has {size} of {expected_size} bytes")
+    with open(path, "rb") as f:
+        head = f.read(len(EXPECTED_HEADER) + 4).lstrip(b'\xef\xbb\xbf"')
+    if not head.startswith(EXPECTED_HEADER):
+        raise ValueError(f"{path} does not start with an SOS voter file header")
+
+
+def download_county(product, download_dir, url_template=SOS_COUNTY_URL, session=None, attempts=ATTEMPTS):
+    """
+    Download one county file to download_dir/county-{product}.txt and return its path.
+    The body is streamed to a .part file; an interrupted transfer is resumed with a Range
+    request on the next attempt (or the next run), and the file is renamed into place only
+    after verify_download passes.
+    """
+    if session is None:
+        session = open_session()
+    os.makedirs(download_dir, exist_ok=True)
+    path = os.path.join(download_dir, f"county-{product}.txt")
+    part_path = path + ".part"
+    url = url_template.format(product=product)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            expected_size = _transfer(session, url, part_path)
+            verify_download(part_path, expected_size)
+            break
+        # A connection dropped mid-body surfaces as ChunkedEncodingError, even without chunking.
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                IncompleteDownload) as e:
+            if attempt == attempts:
+                raise
+            print(f"Download of county {product} interrupted ({e}); resuming")
+            time.sleep(attempt)
+        except ValueError:
+            # Not a voter file at all; don't resume from it.
+            _discard_part(part_path)
+            raise
+    os.replace(part_path, path)
+    _discard_part(part_path)
+    print(f"Downloaded county {product}: {path}")
+    return path
+
+
+def download_with_chrome(product, download_dir, url_template=SOS_COUNTY_URL, timeout=TIMEOUT):
+    """
+    Fallback: let Chrome fetch the county file. Chrome downloads into a fresh subdirectory,
+    so a stale .txt or a half-written temp file from an earlier run is never picked up.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    chrome_dir = os.path.join(download_dir, f"chrome-{product}-{int(time.time())}")
+    os.makedirs(chrome_dir)
+    chrome_options = Options()
+    chrome_options.add_experimental_option("prefs", {
+        "download.default_directory": chrome_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True
+    })
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    try:
+        driver.get(url_template.format(product=product))
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            files = os.listdir(chrome_dir)
+            # Chrome writes .crdownload / .com.google.Chrome.* files until the download is done.
+            in_progress = [f for f in files if f.endswith(".crdownload") or f.startswith(".com.google.Chrome")]
+            txt_files = [f for f in files if f.lower().endswith(".txt")]
+            if txt_files and not in_progress:
+                break
+            time.sleep(1)
+        else:
+            raise IncompleteDownload(f"Chrome download of county {product} timed out")
+    finally:
+        driver.quit()
+
+    path = os.path.join(download_dir, f"county-{product}.txt")
+    os.replace(os.path.join(chrome_dir, txt_files[0]), path)
+    # Chrome may leave temp files behind; none of them are needed.
+    shutil.rmtree(chrome_dir, ignore_errors=True)
+    verify_download(path)
+    print(f"Downloaded county {product} with Chrome: {path}")
+    return path
+
+
+def fetch_county_file(product, download_dir, url_template=SOS_COUNTY_URL, home_url=SOS_HOME_URL, use_chrome=True):
+    """
+    Download a county file over HTTP, falling back to Chrome only if that fails.
+    """
+    try:
+        return download_county(product, download_dir, url_template, open_session(home_url))
+    except Exception as e:
+        if not use_chrome:
+            raise
+        print(f"HTTP download failed ({e}); falling back to Chrome.")
+        return download_with_chrome(product, download_dir, url_template)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic county voter files in the Ohio SOS column layout, for benchmarks and
+offline testing. No real voter data is used.
+
+    python synthetic_voters.py 100000 synthetic-100k.txt
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Identity and district columns of an SOS county export, in file order.
+SOS_COLUMNS = [
+    "SOS_VOTERID", "COUNTY_NUMBER", "COUNTY_ID", "LAST_NAME", "FIRST_NAME", "MIDDLE_NAME", "SUFFIX",
+    "DATE_OF_BIRTH", "REGISTRATION_DATE", "VOTER_STATUS", "PARTY_AFFILIATION",
+    "RESIDENTIAL_ADDRESS1", "RESIDENTIAL_SECONDARY_ADDR", "RESIDENTIAL_CITY", "RESIDENTIAL_STATE",
+    "RESIDENTIAL_ZIP", "RESIDENTIAL_ZIP_PLUS4", "RESIDENTIAL_COUNTRY", "RESIDENTIAL_POSTALCODE",
+    "MAILING_ADDRESS1", "MAILING_SECONDARY_ADDRESS", "MAILING_CITY", "MAILING_STATE", "MAILING_ZIP",
+    "MAILING_ZIP_PLUS4", "MAILING_COUNTRY", "MAILING_POSTAL_CODE", "CAREER_CENTER", "CITY",
+    "CITY_SCHOOL_DISTRICT", "COUNTY_COURT_DISTRICT", "CONGRESSIONAL_DISTRICT", "COURT_OF_APPEALS",
+    "EDU_SERVICE_CENTER_DISTRICT", "EXEMPTED_VILL_SCHOOL_DISTRICT", "LIBRARY", "LOCAL_SCHOOL_DISTRICT",
+    "MUNICIPAL_COURT_DISTRICT", "PRECINCT_NAME", "PRECINCT_CODE", "STATE_BOARD_OF_EDUCATION",
+    "STATE_REPRESENTATIVE_DISTRICT", "STATE_SENATE_DISTRICT", "TOWNSHIP", "VILLAGE", "WARD",
+]
+
+LAST_NAMES = ["SMITH", "JOHNSON", "WILLIAMS", "BROWN", "JONES", "MILLER", "DAVIS", "WILSON", "TAYLOR",
+              "CLARK", "LEWIS", "WALKER", "HALL", "ALLEN", "YOUNG", "KING", "WRIGHT", "SCOTT", "GREEN", "BAKER"]
+FIRST_NAMES = ["JAMES", "MARY", "JOHN", "PATRICIA", "ROBERT", "JENNIFER", "MICHAEL", "LINDA", "WILLIAM",
+               "ELIZABETH", "DAVID", "BARBARA", "RICHARD", "SUSAN", "JOSEPH", "JESSICA", "THOMAS", "SARAH"]
+STREETS = ["ARTHUR", "BRADFORD", "KENSINGTON", "BELVEDERE", "ELM", "MAIN", "PARK", "HIGHLAND", "MAHONING",
+           "TOD", "HARMON", "PERKINS", "NILES", "YOUNGSTOWN", "WOODLAND", "MARKET", "HIGH", "VINE"]
+STREET_TYPES = ["AVE", "ST", "DR", "RD", "BLVD", "CT", "PL"]
+DIRECTIONS = ["NW", "NE", "SW", "SE", ""]
+# (city, ward prefix, share of the county) — Warren is one city among several.
+CITIES = [("WARREN CITY", "WARREN-WARD", 0.15), ("NILES CITY", "NILES-WARD", 0.08),
+          ("GIRARD CITY", "GIRARD-WARD", 0.04), ("HOWLAND TOWNSHIP", None, 0.73)]
+
+
+def election_headers(first_year=2000, last_year=2025):
+    """
+    SOS-style vote-history headers: a primary and a general every year, a special most years.
+    """
+    headers = []
+    for year in range(first_year, last_year + 1):
+        if year % 3 == 1:
+            headers.append(f"SPECIAL-02/{(year % 27) + 1:02d}/{year}")
+        headers.append(f"PRIMARY-{'03' if year % 2 == 0 else '05'}/0{year % 7 + 1}/{year}")
+        headers.append(f"GENERAL-11/0{(year % 6) + 2}/{year}")
+    return headers
+
+
+def synthetic_voters(rows, seed=0, start_id=0, elections=None):
+    """
+    Return a DataFrame of rows synthetic voters in the SOS layout.
+    """
+    rng = np.random.default_rng(seed)
+    elections = elections or election_headers()
+    pick = lambda values: np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+    ids = np.arange(start_id, start_id + rows)
+    city_idx = rng.choice(len(CITIES), size=rows, p=[share for _, _, share in CITIES])
+    ward_no = rng.integers(1, 8, rows)
+    precinct_letter = np.array(list("ABCDEF"), dtype=object)[rng.integers(0, 6, rows)]
+    cities = np.array([c for c, _, _ in CITIES], dtype=object)[city_idx]
+    wards = np.array([
+        f"{CITIES[c][1]} {w}" if CITIES[c][1] else None for c, w in zip(city_idx, ward_no)
+    ], dtype=object)
+    precincts = np.array([
+        f"{cities[i]} {ward_no[i]}{precinct_letter[i]}" for i in range(rows)
+    ], dtype=object)
+
+    dob = pd.Timestamp("1930-01-01") + pd.to_timedelta(rng.integers(0, 365 * 75, rows), unit="D")
+    registered = pd.Timestamp("1970-01-01") + pd.to_timedelta(rng.integers(0, 365 * 55, rows), unit="D")
+    address = [
+        " ".join(part for part in parts if part)
+        for parts in zip(rng.integers(100, 4000, rows).astype(str), pick(STREETS), pick(STREET_TYPES), pick(DIRECTIONS))
+    ]
+
+    df = pd.DataFrame({col: None for col in SOS_COLUMNS}, index=range(rows))
+    df["SOS_VOTERID"] = [f"OH{i:010d}" for i in ids]
+    df["COUNTY_NUMBER"] = 78
+    df["COUNTY_ID"] = ids + 1
+    df["LAST_NAME"] = pick(LAST_NAMES)
+    df["FIRST_NAME"] = pick(FIRST_NAMES)
+    df["DATE_OF_BIRTH"] = dob.strftime("%Y-%m-%d")
+    df["REGISTRATION_DATE"] = registered.strftime("%Y-%m-%d")
+    df["VOTER_STATUS"] = np.where(rng.random(rows) < 0.9, "ACTIVE", "CONFIRMATION")
+    df["PARTY_AFFILIATION"] = pick(["D", "R", None, None])
+    df["RESIDENTIAL_ADDRESS1"] = address
+    df["RESIDENTIAL_CITY"] = [c.split()[0] for c in cities]
+    df["RESIDENTIAL_STATE"] = "OH"
+    df["RESIDENTIAL_ZIP"] = rng.choice([44481, 44483, 44484, 44485], rows)
+    df["CITY"] = np.where(np.array([CITIES[c][1] is not None for c in city_idx]), cities, None)
+    df["TOWNSHIP"] = np.where(df["CITY"].isna(), cities, None)
+    df["PRECINCT_NAME"] = precincts
+    df["PRECINCT_CODE"] = [f"78-P-{c}{w}{p}" for c, w, p in zip(city_idx, ward_no, precinct_letter)]
+    df["WARD"] = wards
+
+    # Each voter has a turnout propensity and a party lean; ballots are D/R in primaries, X otherwise.
+    propensity = rng.beta(1.5, 2.5, rows)
+    lean = rng.random(rows)
+    votes = {}
+    for header in elections:
+        voted = rng.random(rows) < propensity
+        if header.startswith("PRIMARY-"):
+            ballot = np.where(rng.random(rows) < lean, "D", "R").astype(object)
+        else:
+            ballot = np.full(rows, "X", dtype=object)
+        votes[header] = np.where(voted, ballot, None)
+    return pd.concat([df, pd.DataFrame(votes)], axis=1)
+
+
+def write_synthetic_file(path, rows, seed=0, chunk_rows=100000):
+    """
+    Write rows synthetic voters to path as an SOS-format CSV, chunk by chunk so memory
+    stays flat for large files.
+    """
+    elections = election_headers()
+    for start in range(0, rows, chunk_rows):
+        chunk = synthetic_voters(min(chunk_rows, rows - start), seed=seed + start, start_id=start, elections=elections)
+        chunk.to_csv(path, index=False, mode="w" if start == 0 else "a", header=start == 0)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic SOS-format county voter file.")
+    parser.add_argument("rows", type=int, help="number of voters")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_file(args.output, args.rows, seed=args.seed)
+    print(f"Wrote {args.rows} synthetic voters to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Target lists from rule files instead of hand-filtered workbooks.
+
+A rule file has one target per line, "name: expression", with # comments:
+
+    muni-regulars: Muni >= 2 and Latest >= 1 and Both == 0 and WARD in [3, 5]
+    new-dems:      PARTY_AFFILIATION == "D" and Total < 3
+
+Expressions use column names, numbers, strings, lists, comparisons (== != < <= > >= in,
+not in) and and/or/not. "Total" means the "Total:" column. A number compared with a text
+column such as WARD or PRECINCT_NAME matches the number in the value, so WARD in [3, 5]
+selects "WARREN-WARD 3" and "WARREN-WARD 5".
+
+    python targeting.py targets.rules CityOfWarren2025-02-06.csv --maps --wards
+"""
+import argparse
+import ast
+import io
+import operator
+import os
+import threading
+import tokenize
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from voter_scores import SCORE_COLUMNS, add_scores
+
+# Rule names for columns that are not Python identifiers.
+COLUMN_ALIASES = {"Total": "Total:"}
+
+# Layout of the Google Maps target CSVs (googlemaps/*-target-googlemaps.csv).
+MAPS_COLUMNS = ["SOS_VOTERID", "COUNTY_ID", "LAST_NAME", "FIRST_NAME", "DISPLAY", "DATE_OF_BIRTH",
+                "REGISTRATION_DATE", "VOTER_STATUS", "PARTY_AFFILIATION", "StreetName", "RESIDENTIAL_ADDRESS1",
+                "RESIDENTIAL_SECONDARY_ADDR", "RESIDENTIAL_CITY", "RESIDENTIAL_STATE", "RESIDENTIAL_ZIP",
+                "PRECINCT_NAME", "WARD"] + SCORE_COLUMNS
+
+_COMPARE = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+
+
+class RuleError(ValueError):
+    pass
+
+
+def _strip_comment(line):
+    """
+    line without its # comment. A # inside a quoted string in the expression
+    (RESIDENTIAL_SECONDARY_ADDR == "# 3") is part of the rule, not a comment.
+    """
+    name, sep, expression = line.partition(":")
+    if not sep or "#" in name:
+        return line.split("#", 1)[0]
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(expression).readline):
+            if token.type == tokenize.COMMENT:
+                return name + sep + expression[:token.start[1]]
+    except (tokenize.TokenError, SyntaxError):
+        # An unterminated string or bracket: leave the line for the parser to report.
+        pass
+    return line
+
+
+def read_rules(path):
+    """
+    Return {name: expression} from a rule file, in file order.
+    """
+    rules = {}
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            line = _strip_comment(line).strip()
+            if not line:
+                continue
+            name, sep, expression = line.partition(":")
+            if not sep or not name.strip() or not expression.strip():
+                raise RuleError(f"{path}:{number}: expected 'name: expression'")
+            rules[name.strip()] = expression.strip()
+    return rules
+
+
+class TargetEngine:
+    """
+    Compiles rule expressions into boolean masks over one scored frame. Every sub-expression
+    (a comparison, an and/or, a column's numeric view) is evaluated once per frame and shared
+    by all the rules that contain it, so ten lists that reuse "Latest >= 1" compute it once.
+    """
+
+    def __init__(self, df, max_masks=None):
+        """
+        max_masks bounds the masks kept (least recently used go first); None keeps them all,
+        which suits one pass over a rule file. A long-running service that evaluates ad-hoc
+        rules should pass a bound. The engine may be shared between threads.
+        """
+        self.df = df
+        self.max_masks = max_masks
+        self.masks = OrderedDict()
+        self.columns = {}
+        self.lock = threading.Lock()
+
+    def mask(self, expression):
+        try:
+            tree = ast.parse(expression, mode="eval").body
+        except SyntaxError as e:
+            raise RuleError(f"Cannot parse rule {expression!r}: {e.msg}") from None
+        return self._eval(tree)
+
+    def select(self, rules):
+        """
+        Return {name: rows of df matching the rule} for every rule.
+        """
+        return {name: self.df[self.mask(expression)] for name, expression in rules.items()}
+
+    def _eval(self, node):
+        key = ast.dump(node)
+        with self.lock:
+            mask = self.masks.get(key)
+            if mask is not None:
+                self.masks.move_to_end(key)
+                return mask
+        # Computed outside the lock so other threads' lookups are not held up.
+        mask = self._compute(node)
+        with self.lock:
+            self.masks[key] = mask
+            if self.max_masks is not None:
+                while len(self.masks) > self.max_masks:
+                    self.masks.popitem(last=False)
+        return mask
+
+    def _compute(self, node):
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = self._eval(node.values[0])
+            for value in node.values[1:]:
+                result = combine(result, self._eval(value))
+            return result
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self._eval(node.operand)
+        if isinstance(node, ast.Compare):
+            result = None
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                part = self._compare(left, op, right)
+                result = part if result is None else result & part
+                left = right
+            return result
+        raise RuleError(f"Unsupported rule syntax: {ast.unparse(node)}")
+
+    def _compare(self, left, op, right):
+        if isinstance(left, ast.Constant) and isinstance(right, ast.Name) and type(op) in _COMPARE:
+            # 3 <= Total  ->  Total >= 3
+            flipped = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}.get(type(op), type(op))
+            left, op, right = right, flipped(), left
+        if not isinstance(left, ast.Name):
+            raise RuleError(f"Left side of a comparison must be a column: {ast.unparse(left)}")
+        literal = self._literal(right)
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(literal, (list, tuple, set)):
+                raise RuleError(f"'in' needs a list: {ast.unparse(right)}")
+            numeric = all(isinstance(v, (int, float)) for v in literal)
+            values = self._column(left.id, numeric)
+            result = values.isin(list(literal)).to_numpy()
+            return ~result if isinstance(op, ast.NotIn) else result
+        if type(op) not in _COMPARE:
+            raise RuleError(f"Unsupported comparison in {ast.unparse(left)} ... {ast.unparse(right)}")
+        numeric = isinstance(literal, (int, float))
+        values = self._column(left.id, numeric)
+        # Blank cells match nothing except !=.
+        present = values.notna().to_numpy()
+        result = np.zeros(len(values), dtype=bool)
+        try:
+            result[present] = np.asarray(_COMPARE[type(op)](values.to_numpy()[present], literal), dtype=bool)
+        except TypeError:
+            raise RuleError(f"Cannot compare {left.id} with {literal!r}: {ast.unparse(right)} "
+                            f"is the wrong type for this column") from None
+        if isinstance(op, ast.NotEq):
+            result |= ~present
+        return result
+
+    def _literal(self, node):
+        try:
+            return ast.literal_eval(node)
+        except ValueError:
+            raise RuleError(f"Expected a number, string or list: {ast.unparse(node)}") from None
+
+    def _column(self, name, numeric):
+        """
+        The column as compared in rules: numbers for a numeric comparison (the number inside
+        text values like "WARREN-WARD 3"), otherwise text. Cached per column and view.
+        """
+        key = (name, numeric)
+        if key not in self.columns:
+            column = COLUMN_ALIASES.get(name, name)
+            if column not in self.df.columns:
+                raise RuleError(f"Unknown column {name!r}")
+            values = self.df[column]
+            if numeric and not pd.api.types.is_numeric_dtype(values):
+                text = values.astype(object).astype("string")
+                values = pd.to_numeric(text.str.extract(r"(\d+(?:\.\d+)?)\D*$", expand=False), errors="coerce")
+            elif not numeric:
+                values = values.astype(object)
+            self.columns[key] = values
+        return self.columns[key]
+
+
+def maps_frame(df):
+    """
+    df in the Google Maps target CSV layout, with DISPLAY and StreetName as literal text
+    ("ROWLEY 1947T=39D=8R=2M=7L=10B=16", "ARTHUR DR NW").
+    """
+    from addresses import street_names
+    from voter_export import display_text
+
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%d")
+    out["DISPLAY"] = display_text(out)
+    out["StreetName"] = street_names(out["RESIDENTIAL_ADDRESS1"])
+    return out[[col for col in MAPS_COLUMNS if col in out.columns]]
+
+
+def load_scored(path):
+    """
+    Scored voters from a county .txt file (Warren wards only) or from a CSV export.
+    """
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype={"SOS_VOTERID": str, "RESIDENTIAL_ZIP": str}, low_memory=False)
+    else:
+        from voter_ingest import load_voter_file
+
+        df = load_voter_file(path)
+        df = df[df["WARD"].str.contains("WARREN-WARD", case=False, na=False)].sort_values(by="PRECINCT_NAME")
+    if not all(col in df.columns for col in SCORE_COLUMNS):
+        df = add_scores(df)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build every target list in a rule file in one pass.")
+    parser.add_argument("rules_file")
+    parser.add_argument("input_file", help="county .txt file or a scored voter CSV")
+    parser.add_argument("--output-dir", default=".", help="directory for the target files")
+    parser.add_argument("--maps", action="store_true",
+                        help="also split each target into Google Maps files (see wardfilterforgooglemaps.py)")
+    parser.add_argument("--wards", action="store_true", help="also write city and per-ward xlsx files per target")
+    parser.add_argument("--workers", type=int, default=1, help="processes used for the xlsx files")
+    args = parser.parse_args()
+
+    rules = read_rules(args.rules_file)
+    df = load_scored(args.input_file)
+    targets = TargetEngine(df).select(rules)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name, target_df in targets.items():
+        csv_file = os.path.join(args.output_dir, f"{name}-target-googlemaps.csv")
+        maps_frame(target_df).to_csv(csv_file, index=False)
+        print(f"{name}: {len(target_df)} voters -> {csv_file}")
+        if args.maps:
+            from wardfilterforgooglemaps import split_csv
+
+            split_csv(csv_file, output_dir=args.output_dir)
+        if args.wards:
+            from voter_export import export_wards
+
+            export_wards(target_df, os.path.join(args.output_dir, f"{name}-target.xlsx"),
+                         os.path.join(args.output_dir, f"City_of_{{ward}}-{name}-target.xlsx"), workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
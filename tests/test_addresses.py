@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from addresses import normalize_addresses, normalize_units, parse_address, parse_addresses, street_names
+
+
+@pytest.mark.parametrize("raw, number, suffix, street_name, unit", [
+    # House number suffixes.
+    ("1256-B Arthur Drive N.W.", "1256", "B", "ARTHUR DR NW", ""),
+    ("1256B ARTHUR DR NW", "1256", "B", "ARTHUR DR NW", ""),
+    ("1256 B Arthur Dr", "1256", "B", "ARTHUR DR", ""),
+    ("376 1/2 South Leavitt Rd", "376", "1/2", "S LEAVITT RD", ""),
+    ("888 1/2 Elm St", "888", "1/2", "ELM ST", ""),
+    # A lone letter is the street when no other street name follows it.
+    ("1256 B ST NW", "1256", "", "B ST NW", ""),
+    ("12 B ST APT 3", "12", "", "B ST", "APT 3"),
+    ("45 N Park Ave", "45", "", "N PARK AVE", ""),
+    # Unit words that are part of the street name.
+    ("100 N FRONT ST", "100", "", "N FRONT ST", ""),
+    ("45 E LOWER RIVER RD", "45", "", "E LOWER RIVER RD", ""),
+    ("12 UPPER ST", "12", "", "UPPER ST", ""),
+    ("12 N FRONT", "12", "", "N FRONT", ""),
+    # Units.
+    ("1408 Kensington St NW Apt 3", "1408", "", "KENSINGTON ST NW", "APT 3"),
+    ("1408 Kensington St NW Apartment 3B", "1408", "", "KENSINGTON ST NW", "APT 3B"),
+    ("12 Main St # 3", "12", "", "MAIN ST", "#3"),
+    ("12 Main St #3", "12", "", "MAIN ST", "#3"),
+    ("12 Main St Lot 12-B", "12", "", "MAIN ST", "LOT 12-B"),
+    ("12 Main St Rear", "12", "", "MAIN ST", "REAR"),
+    ("Rear 1256 Arthur Dr", "1256", "", "ARTHUR DR", "REAR"),
+    # No house number.
+    ("PO Box 12", "", "", "PO BOX 12", ""),
+    ("Front St", "", "", "FRONT ST", ""),
+])
+def test_parse_address(raw, number, suffix, street_name, unit):
+    address = parse_address(raw)
+    assert (address.house_number, address.house_suffix, address.street_name, address.unit) == \
+        (number, suffix, street_name, unit)
+
+
+def test_same_door_same_spelling():
+    assert parse_address("1256-B Arthur Drive N.W.").normalized == parse_address("1256B ARTHUR DR NW").normalized
+    assert parse_address("376 1/2 South Leavitt Rd").normalized == "376 1/2 S LEAVITT RD"
+
+
+def test_vectorized_helpers_keep_blanks_and_index():
+    values = pd.Series(["1256-B Arthur Drive N.W.", None, "100 N Front St", "1256-B Arthur Drive N.W."],
+                       index=[10, 11, 12, 13])
+    assert street_names(values).tolist() == ["ARTHUR DR NW", "", "N FRONT ST", "ARTHUR DR NW"]
+    assert normalize_addresses(values).tolist() == ["1256B ARTHUR DR NW", "", "100 N FRONT ST", "1256B ARTHUR DR NW"]
+    parsed = parse_addresses(values)
+    assert parsed.index.tolist() == [10, 11, 12, 13]
+    assert parsed.loc[11].tolist() == [""] * len(parsed.columns)
+    assert normalize_units(pd.Series(["Apartment 3", "# 3", None])).tolist() == ["APT 3", "#3", ""]
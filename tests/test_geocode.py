@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geocode import EARTH_RADIUS, PointIndex, near
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture(scope="module")
+def points():
+    # Warren-sized scatter (negative longitudes), with a few points missing coordinates.
+    rng = np.random.default_rng(7)
+    latitude = 41.237 + rng.uniform(-0.05, 0.05, 5000)
+    longitude = -80.818 + rng.uniform(-0.07, 0.07, 5000)
+    latitude[::97] = np.nan
+    return latitude, longitude
+
+
+@pytest.mark.parametrize("meters", [10, 249, 250, 251, 800, 3000])
+def test_within_radius_matches_haversine(points, meters):
+    latitude, longitude = points
+    index = PointIndex(latitude, longitude)
+    for lat, lon in [(41.237, -80.818), (41.2, -80.75), (41.287, -80.888)]:
+        distance = haversine(lat, lon, latitude, longitude)
+        found = index.within_radius(lat, lon, meters)
+        # The flat projection is within 0.1% of haversine at city scale.
+        tolerance = max(0.5, meters * 1e-3)
+        sure = set(np.flatnonzero(distance <= meters - tolerance))
+        maybe = set(np.flatnonzero(distance <= meters + tolerance))
+        assert sure <= set(found) <= maybe
+        assert np.all(np.diff(distance[found]) >= -2 * tolerance)
+
+
+def test_grid_cell_edges():
+    # Points exactly on and either side of cell boundaries, on both sides of zero.
+    size = 250
+    step = math.degrees(size / EARTH_RADIUS)
+    latitude = np.array([-step, -step / 2, 0.0, step / 2, step, step * 1.0001, -step * 1.0001])
+    longitude = np.array([-step, step, 0.0, -step / 2, step, 0.0, 0.0])
+    index = PointIndex(latitude, longitude, cell_meters=size)
+    for lat, lon in zip(latitude, longitude):
+        for meters in (1, size / 2, size, size * 1.5):
+            distance = haversine(lat, lon, latitude, longitude)
+            assert set(index.within_radius(lat, lon, meters)) == set(np.flatnonzero(distance <= meters + 1e-6))
+
+
+def test_within_bbox_matches_brute_force(points):
+    latitude, longitude = points
+    index = PointIndex(latitude, longitude)
+    south, west, north, east = 41.22, -80.84, 41.25, -80.80
+    expected = np.flatnonzero((latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east))
+    assert np.array_equal(index.within_bbox(south, west, north, east), expected)
+
+
+def test_no_points():
+    index = PointIndex([np.nan], [np.nan])
+    assert len(index.within_radius(41.2, -80.8, 1000)) == 0
+
+
+def test_near_adds_distance(points):
+    latitude, longitude = points
+    df = pd.DataFrame({"LATITUDE": latitude, "LONGITUDE": longitude})
+    result = near(df, 41.237, -80.818, 500)
+    assert result["DISTANCE_M"].is_monotonic_increasing
+    assert np.allclose(result["DISTANCE_M"], haversine(41.237, -80.818, result["LATITUDE"], result["LONGITUDE"]),
+                       atol=0.5)
@@ -0,0 +1,121 @@
+import http.server
+import os
+import threading
+
+import pytest
+import requests
+
+import sos_download
+from sos_download import download_county
+
+HEADER = b"SOS_VOTERID,LAST_NAME\n"
+
+
+class CountyHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves server.body with a strong ETag, honouring Range only under a matching If-Range.
+    With server.drop_after set, the next full or partial response stops after that many
+    bytes and the connection is closed, as an interrupted download would be.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body, etag = server.body, server.etag
+        start = 0
+        requested = self.headers.get("Range")
+        if requested and self.headers.get("If-Range") in (None, etag):
+            start = int(requested.split("=")[1].rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        part = body[start:]
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(part)))
+        self.end_headers()
+        if server.drop_after is not None:
+            self.wfile.write(part[:server.drop_after])
+            server.drop_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(part)
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Blocks are written whole, so a dropped connection keeps only the full blocks received.
+    monkeypatch.setattr(sos_download, "BLOCK_SIZE", 1024)
+    monkeypatch.setattr(sos_download.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), CountyHandler)
+    httpd.body = HEADER + b"".join(b"OH%010d,SMITH\n" % i for i in range(5000))
+    httpd.etag = '"v1"'
+    httpd.drop_after = None
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/county/{{product}}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def download(server, tmp_path):
+    return download_county(78, str(tmp_path), server.url, requests.Session())
+
+
+def test_full_download(server, tmp_path):
+    path = download(server, tmp_path)
+    assert open(path, "rb").read() == server.body
+    assert os.listdir(tmp_path) == ["county-78.txt"]
+    assert "Range" not in server.requests[0]
+
+
+def test_interrupted_download_resumes(server, tmp_path):
+    server.drop_after = 40000
+    path = download(server, tmp_path)
+    assert open(path, "rb").read() == server.body
+    assert len(server.requests) == 2
+    assert server.requests[1]["Range"] == f"bytes={40000 // 1024 * 1024}-"
+    assert server.requests[1]["If-Range"] == '"v1"'
+    assert os.listdir(tmp_path) == ["county-78.txt"]
+
+
+def test_changed_file_restarts(server, tmp_path):
+    # A part left by an interrupted run, then the SOS regenerates the file.
+    server.drop_after = 40000
+    with pytest.raises(Exception):
+        download_county(78, str(tmp_path), server.url, requests.Session(), attempts=1)
+    assert os.path.getsize(tmp_path / "county-78.txt.part") == 40000 // 1024 * 1024
+    server.body = HEADER + b"".join(b"OH%010d,JONES\n" % i for i in range(6000))
+    server.etag = '"v2"'
+    path = download(server, tmp_path)
+    assert open(path, "rb").read() == server.body
+    assert server.requests[-1]["If-Range"] == '"v1"'
+
+
+def test_part_without_validator_restarts(server, tmp_path):
+    (tmp_path / "county-78.txt.part").write_bytes(b"stale bytes from an older version of the file")
+    path = download(server, tmp_path)
+    assert open(path, "rb").read() == server.body
+    assert "Range" not in server.requests[-1]
+
+
+def test_oversized_part_restarts(server, tmp_path):
+    (tmp_path / "county-78.txt.part").write_bytes(server.body + b"extra")
+    (tmp_path / "county-78.txt.part.validator").write_text('"v1"')
+    path = download(server, tmp_path)
+    assert open(path, "rb").read() == server.body
+    assert os.listdir(tmp_path) == ["county-78.txt"]
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic_voters import synthetic_voters
+from targeting import RuleError, TargetEngine, read_rules
+from voter_scores import add_scores
+
+
+@pytest.fixture(scope="module")
+def voters():
+    df = add_scores(synthetic_voters(3000, seed=3))
+    # A few secondary addresses that contain "#".
+    df["RESIDENTIAL_SECONDARY_ADDR"] = np.where(np.arange(len(df)) % 50 == 0, "# 3", None)
+    return df
+
+
+def ward_number(df):
+    return pd.to_numeric(df["WARD"].astype("string").str.extract(r"(\d+)\D*$", expand=False), errors="coerce")
+
+
+def test_read_rules_comments(tmp_path):
+    path = tmp_path / "targets.rules"
+    path.write_text(
+        "# a comment line\n"
+        "\n"
+        "unit-3: RESIDENTIAL_SECONDARY_ADDR == \"# 3\"   # apartment three\n"
+        "hash-in-single: RESIDENTIAL_SECONDARY_ADDR == '#3'\n"
+        "regulars: Muni >= 2 and Latest >= 1  # trailing comment\n"
+        "list:  WARD in [3, # the third\n"
+    )
+    rules = read_rules(path)
+    assert rules["unit-3"] == 'RESIDENTIAL_SECONDARY_ADDR == "# 3"'
+    assert rules["hash-in-single"] == "RESIDENTIAL_SECONDARY_ADDR == '#3'"
+    assert rules["regulars"] == "Muni >= 2 and Latest >= 1"
+    assert rules["list"] == "WARD in [3,"
+
+
+def test_read_rules_needs_name(tmp_path):
+    path = tmp_path / "targets.rules"
+    path.write_text("Muni >= 2 # no name\n")
+    with pytest.raises(RuleError):
+        read_rules(path)
+
+
+def test_masks_match_pandas(voters):
+    df = voters
+    ward = ward_number(df)
+    expected = {
+        "Muni >= 2 and Latest >= 1 and Both == 0 and WARD in [3, 5]":
+            (df["Muni"] >= 2) & (df["Latest"] >= 1) & (df["Both"] == 0) & ward.isin([3, 5]),
+        "WARD == 3 and Latest >= 1 and REPS == 0": (ward == 3) & (df["Latest"] >= 1) & (df["REPS"] == 0),
+        'PARTY_AFFILIATION == "D" and Total < 3': (df["PARTY_AFFILIATION"] == "D") & (df["Total:"] < 3),
+        "3 <= Total < 10": (df["Total:"] >= 3) & (df["Total:"] < 10),
+        "not (Dems > 1 or REPS > 1)": ~((df["Dems"] > 1) | (df["REPS"] > 1)),
+        'PARTY_AFFILIATION not in ["D", "R"]': ~df["PARTY_AFFILIATION"].isin(["D", "R"]),
+        # Blank cells match != only.
+        "WARD != 3": ~(ward == 3).fillna(False),
+        'RESIDENTIAL_SECONDARY_ADDR == "# 3"': df["RESIDENTIAL_SECONDARY_ADDR"] == "# 3",
+    }
+    engine = TargetEngine(df)
+    for rule, mask in expected.items():
+        assert np.array_equal(engine.mask(rule), mask.fillna(False).to_numpy(dtype=bool)), rule
+
+
+def test_select_returns_rows(voters):
+    targets = TargetEngine(voters).select({"dems": 'PARTY_AFFILIATION == "D"'})
+    assert targets["dems"].equals(voters[voters["PARTY_AFFILIATION"] == "D"])
+
+
+@pytest.mark.parametrize("rule", ["Total >", "Nope == 1", "Total in 3", "len(WARD) > 1", "1 == 1", 'Total > "a"'])
+def test_bad_rules(voters, rule):
+    with pytest.raises(RuleError):
+        TargetEngine(voters).mask(rule)
+
+
+def test_bounded_masks_from_threads(voters):
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = TargetEngine(voters, max_masks=8)
+    rules = [f"Total >= {n} and Latest >= {n % 3}" for n in range(40)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        masks = list(pool.map(engine.mask, rules))
+    assert len(engine.masks) <= 8
+    for n, mask in enumerate(masks):
+        expected = (voters["Total:"] >= n) & (voters["Latest"] >= n % 3)
+        assert np.array_equal(mask, expected.to_numpy(dtype=bool))
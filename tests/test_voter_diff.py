@@ -0,0 +1,88 @@
+import os
+
+import pandas as pd
+import pytest
+
+from synthetic_voters import synthetic_voters
+from voter_diff import diff_snapshots, load_snapshot, rescore_changed, save_snapshot
+from voter_export import carry_forward
+from voter_scores import SCORE_COLUMNS, add_scores
+
+YEAR = 2025
+
+
+@pytest.fixture
+def snapshots():
+    """
+    A scored snapshot and the next download, with one voter for each kind of change.
+    """
+    old = add_scores(synthetic_voters(500, seed=5), current_year=YEAR)
+    new = synthetic_voters(500, seed=5).iloc[1:]
+    new = pd.concat([new, synthetic_voters(1, seed=6, start_id=9000)], ignore_index=True)
+    last_election = new.columns[-1]
+    rows = {kind: new.index[new["WARD"].notna() & new[last_election].isna()][i]
+            for i, kind in enumerate(["moved", "voted", "address", "changed"])}
+    new.loc[rows["moved"], "WARD"] = "WARREN-WARD 9"
+    new.loc[rows["voted"], last_election] = "X"
+    new.loc[rows["address"], "RESIDENTIAL_ADDRESS1"] = "1256 ARTHUR DR NW"
+    new.loc[rows["changed"], "LAST_NAME"] = "TOWLES-SMITH"
+    expected = {(new.loc[row, "SOS_VOTERID"], kind) for kind, row in rows.items()}
+    expected |= {(old["SOS_VOTERID"].iloc[0], "removed"), ("OH0000009000", "added")}
+    return old, new, expected
+
+
+def test_diff_kinds(snapshots):
+    old, new, expected = snapshots
+    delta = diff_snapshots(old, new)
+    assert set(zip(delta["SOS_VOTERID"], delta["CHANGE"].astype(str))) == expected
+    moved = delta[delta["CHANGE"] == "moved"].iloc[0]
+    assert moved["WARD_NEW"] == "WARREN-WARD 9" and moved["WARD_OLD"] != "WARREN-WARD 9"
+
+
+def test_diff_after_saved_snapshot_is_empty(tmp_path):
+    new = synthetic_voters(500, seed=5)
+    save_snapshot(add_scores(new, current_year=YEAR), "test", current_year=YEAR, cache_dir=str(tmp_path))
+    previous, year = load_snapshot("test", cache_dir=str(tmp_path))
+    assert year == YEAR
+    assert diff_snapshots(previous, new).empty
+
+
+def test_diff_new_column_changes_every_row():
+    old = synthetic_voters(50, seed=5)
+    new = old.assign(EXTRA="1")
+    delta = diff_snapshots(old, new)
+    assert set(delta["CHANGE"].astype(str)) == {"changed"}
+    assert len(delta) == len(old)
+
+
+def test_rescore_changed_matches_full_scoring(snapshots):
+    old, new, _ = snapshots
+    delta = diff_snapshots(old, new)
+    rescored, count = rescore_changed(new, old, delta, current_year=YEAR, previous_year=YEAR)
+    assert count == delta["SOS_VOTERID"].nunique() - 1  # the removed voter is not rescored
+    full = add_scores(new, current_year=YEAR)
+    pd.testing.assert_frame_equal(rescored[SCORE_COLUMNS], full[SCORE_COLUMNS])
+    assert list(rescored.columns) == list(full.columns)
+
+
+def test_carry_forward_keeps_earlier_files(tmp_path):
+    ward_filename = str(tmp_path / "City_of_{ward}-{date}.csv")
+    wards = ["WARREN-WARD 1", "WARREN-WARD 2"]
+    previous_files = {}
+    for ward in wards:
+        filename = ward_filename.format(ward=ward, date="2025-02-05")
+        with open(filename, "w") as f:
+            f.write(f"{ward} on 2025-02-05\n")
+        previous_files[ward_filename.format(ward=ward, date="{date}")] = filename
+    today = ward_filename.replace("{date}", "2025-02-06")
+    # Ward 2's file for today is still a hard link to the earlier file, as older runs left it.
+    os.link(ward_filename.format(ward="WARREN-WARD 2", date="2025-02-05"), today.format(ward="WARREN-WARD 2"))
+
+    carried, missing = carry_forward(previous_files, today, wards + ["WARREN-WARD 3"], ["csv"], "2025-02-06")
+    assert missing == ["WARREN-WARD 3"]
+    assert sorted(carried.values()) == [today.format(ward=ward) for ward in wards]
+    for ward in wards:
+        with open(today.format(ward=ward), "w") as f:
+            f.write("rewritten\n")
+        with open(previous_files[ward_filename.format(ward=ward, date="{date}")]) as f:
+            assert f.read() == f"{ward} on 2025-02-05\n"
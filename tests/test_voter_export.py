@@ -0,0 +1,49 @@
+import re
+
+import pandas as pd
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from synthetic_voters import synthetic_voters
+from voter_export import build_output_frame
+from voter_scores import SCORE_COLUMNS, add_scores
+
+
+def evaluate(formula, values, row):
+    """
+    Evaluate one of the score formulas against values (the literal sheet, sheet row row),
+    knowing only the functions vote_formulas and build_output_frame use.
+    """
+    def cell(letter):
+        value = values.iat[row - 2, column_index_from_string(letter) - 1]
+        return "" if pd.isna(value) else value
+
+    def cells(first, last):
+        return [cell(get_column_letter(i))
+                for i in range(column_index_from_string(first), column_index_from_string(last) + 1)]
+
+    body = formula[1:]
+    if m := re.fullmatch(r"COUNTA\(\$([A-Z]+)\$\d+:\$([A-Z]+)\$\d+\)", body):
+        return sum(v != "" for v in cells(*m.groups()))
+    if m := re.fullmatch(r'COUNTIF\(\$([A-Z]+)\$\d+:\$([A-Z]+)\$\d+,"(\w)"\)', body):
+        return sum(v == m.group(3) for v in cells(m.group(1), m.group(2)))
+    if m := re.fullmatch(r"IF\(AND\(([A-Z]+)\d+>0,([A-Z]+)\d+>0\),1,0\)", body):
+        return int(cell(m.group(1)) > 0 and cell(m.group(2)) > 0)
+    if body == "0":
+        return 0
+    total = 0
+    for term in body.split("+"):
+        m = re.fullmatch(r'IF\(([A-Z]+)\d+(=|<>)"(\w?)",1,0\)', term)
+        assert m, formula
+        letter, op, target = m.groups()
+        total += (cell(letter) == target) == (op == "=")
+    return total
+
+
+def test_score_formulas_match_computed_scores():
+    df = add_scores(synthetic_voters(40, seed=8))
+    literal = build_output_frame(df)
+    sheet = build_output_frame(df, formulas=True)
+    assert list(sheet.columns) == list(literal.columns)
+    for row in range(2, len(sheet) + 2):
+        for col in SCORE_COLUMNS:
+            assert evaluate(sheet[col].iat[row - 2], literal, row) == df[col].iat[row - 2], (row, col)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from voter_schema import election_table
+
+# Fixed cell codes. Any other ballot value (L, G, ...) is appended to the labels as it is seen.
+BLANK, DEM, REP, VOTED = 0, 1, 2, 3
+BASE_LABELS = ["", "D", "R", "X"]
+
+
+class VoteHistory:
+    """
+    Every voter's vote history as one (voters x elections) uint8 array, one small code per
+    cell (see BASE_LABELS), plus the election table describing its columns. The array is
+    column-major so a single election, or a subset of them, is a contiguous read.
+    """
+
+    def __init__(self, codes, elections, labels, index):
+        self.codes = codes
+        self.elections = elections
+        self.labels = labels
+        self.index = index
+
+    @classmethod
+    def from_frame(cls, df):
+        elections = election_table(df.columns)
+        labels = list(BASE_LABELS)
+        codes = np.zeros((len(df), len(elections)), dtype=np.uint8, order="F")
+        for j, col in enumerate(elections["column"]):
+            values = df[col]
+            cat = values.array if isinstance(values.dtype, pd.CategoricalDtype) else pd.Categorical(values)
+            # The extra last slot catches the -1 code pandas uses for missing values.
+            lookup = np.full(len(cat.categories) + 1, BLANK, dtype=np.uint8)
+            for k, value in enumerate(cat.categories):
+                value = str(value).strip().upper()
+                if value not in labels:
+                    if len(labels) == 256:
+                        raise ValueError(f"Too many distinct vote values in {col} for a uint8 code.")
+                    labels.append(value)
+                lookup[k] = labels.index(value)
+            codes[:, j] = lookup[cat.codes]
+        return cls(codes, elections, labels, df.index)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def election_mask(self, types=None, min_year=None, odd_year=None):
+        """
+        Boolean mask over the elections, e.g. election_mask(types=["PRIMARY"], odd_year=True).
+        """
+        mask = np.ones(len(self.elections), dtype=bool)
+        if types is not None:
+            mask &= self.elections["type"].isin(types).to_numpy()
+        if min_year is not None:
+            mask &= (self.elections["year"] >= min_year).to_numpy()
+        if odd_year is not None:
+            mask &= (self.elections["odd_year"] == odd_year).to_numpy()
+        return mask
+
+    def count(self, value=None, elections=None):
+        """
+        Per-voter count of cells equal to value ("D", "R", ...) or, with value=None, of
+        nonblank cells, over all elections or the ones selected by an election mask.
+        """
+        block = self.codes if elections is None else self.codes[:, elections]
+        if value is None:
+            hits = block != BLANK
+        elif value in self.labels:
+            hits = block == self.labels.index(value)
+        else:
+            return np.zeros(len(self), dtype=np.int64)
+        return hits.sum(axis=1, dtype=np.int64)
+
+    def filter(self, rows):
+        """
+        Return the history of a subset of voters, given a boolean mask or positions.
+        """
+        return VoteHistory(
+            np.asfortranarray(self.codes[rows]), self.elections, self.labels, self.index[rows]
+        )
+
+    def to_frame(self):
+        """
+        Decode back to one text column per election, with None for blank cells.
+        """
+        labels = np.array([None] + self.labels[1:], dtype=object)
+        return pd.DataFrame(labels[self.codes], index=self.index, columns=list(self.elections["column"]))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Batch download, filter and score several SOS county files in one run.
+
+Each county is given as PRODUCT[:COLUMN=PATTERN], e.g.
+    python voter_batch.py 78:WARD=WARREN-WARD 50:CITY="YOUNGSTOWN CITY"
+Downloads run concurrently in a thread pool; parsing and scoring run in a process pool as
+each download lands. Results go to one partitioned store: OUTPUT/county=PRODUCT/voters.parquet
+(voters.csv when pyarrow is not installed).
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from sos_download import SOS_COUNTY_URL, SOS_HOME_URL, download_county, open_session
+from voter_ingest import load_voter_file, read_filtered_voters
+from voter_scores import add_scores
+
+
+def parse_county(spec):
+    """
+    "78:WARD=WARREN-WARD" -> ("78", "WARD", "WARREN-WARD"); "78" -> ("78", None, None).
+    """
+    product, _, rule = spec.partition(":")
+    if not rule:
+        return product.strip(), None, None
+    column, sep, pattern = rule.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected PRODUCT[:COLUMN=PATTERN], got {spec!r}")
+    return product.strip(), column.strip().upper(), pattern.strip()
+
+
+def process_county(path, product, column, pattern, output_dir):
+    """
+    Load one county file, keep the rows matching column/pattern, sort by PRECINCT_NAME,
+    score them and write the county's partition. Runs in a worker process.
+    """
+    start = time.perf_counter()
+    if column:
+        df = read_filtered_voters(path, column, pattern)
+    else:
+        df = load_voter_file(path)
+    df = add_scores(df.sort_values(by="PRECINCT_NAME"))
+
+    partition = os.path.join(output_dir, f"county={product}")
+    os.makedirs(partition, exist_ok=True)
+    try:
+        out_path = os.path.join(partition, "voters.parquet")
+        df.to_parquet(out_path, index=False)
+    except ImportError:
+        out_path = os.path.join(partition, "voters.csv")
+        df.to_csv(out_path, index=False)
+    return product, out_path, len(df), time.perf_counter() - start
+
+
+def run_batch(counties, output_dir, download_dir, url_template=SOS_COUNTY_URL, home_url=SOS_HOME_URL,
+              download_workers=4, process_workers=None):
+    """
+    Download every county concurrently and hand each file to the process pool as soon as
+    it is complete. Returns (product, path, rows, seconds) for every county processed.
+    Each download thread opens its own session, since requests does not promise that a
+    Session is thread-safe. The worker processes are spawned rather than forked, so none of
+    them inherits a download thread's half-held locks or sockets.
+    """
+    local = threading.local()
+
+    def fetch(product):
+        if not hasattr(local, "session"):
+            local.session = open_session(home_url)
+        return download_county(product, download_dir, url_template, local.session)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=download_workers) as downloads, \
+            ProcessPoolExecutor(max_workers=process_workers, mp_context=multiprocessing.get_context("spawn")) as workers:
+        fetches = {downloads.submit(fetch, product): (product, column, pattern) for product, column, pattern in counties}
+        jobs = {}
+        for done in as_completed(fetches):
+            product, column, pattern = fetches[done]
+            try:
+                path = done.result()
+            except Exception as e:
+                print(f"Error downloading county {product}: {e}")
+                continue
+            jobs[workers.submit(process_county, path, product, column, pattern, output_dir)] = product
+
+        for job in as_completed(jobs):
+            try:
+                results.append(job.result())
+            except Exception as e:
+                print(f"Error processing county {jobs[job]}: {e}")
+
+    for product, path, rows, seconds in sorted(results):
+        print(f"  county {product:<6} {rows:>8} rows {seconds:8.2f}s  {path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download, filter and score several SOS county files.")
+    parser.add_argument("counties", nargs="+", type=parse_county, metavar="PRODUCT[:COLUMN=PATTERN]",
+                        help="county product number, optionally with a filter such as 78:WARD=WARREN-WARD")
+    parser.add_argument("--output", default="output", help="root of the partitioned output store")
+    parser.add_argument("--downloads", default=os.path.join(os.getcwd(), "downloads"),
+                        help="directory the county files are downloaded to")
+    parser.add_argument("--url-template", default=SOS_COUNTY_URL,
+                        help="county download URL with a {product} field (point it at a local server to test)")
+    parser.add_argument("--home-url", default=SOS_HOME_URL,
+                        help="page visited first to pick up cookies; pass '' to skip")
+    parser.add_argument("--download-workers", type=int, default=4, help="concurrent downloads")
+    parser.add_argument("--workers", type=int, default=None, help="processes used to parse and score")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_batch(args.counties, args.output, args.downloads, args.url_template, args.home_url,
+                        args.download_workers, args.workers)
+    print(f"Processed {len(results)} of {len(args.counties)} counties in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+import json
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from vote_history import VoteHistory
+from voter_ingest import CACHE_DIR
+from voter_schema import election_table
+from voter_scores import SCORE_COLUMNS, compute_scores, insert_scores
+
+# Kinds of change reported between two snapshots, one delta row per voter and kind.
+# "changed" is an edit to any other exported column (name, party, status, ...).
+CHANGE_KINDS = ["added", "removed", "moved", "voted", "address", "changed"]
+PLACE_COLUMNS = ["WARD", "PRECINCT_NAME"]
+ADDRESS_COLUMNS = ["RESIDENTIAL_ADDRESS1", "RESIDENTIAL_SECONDARY_ADDR", "RESIDENTIAL_ZIP"]
+KEY = "SOS_VOTERID"
+
+
+def _differs(old, new):
+    """
+    Elementwise "value changed" for two aligned columns, treating two blanks as equal.
+    """
+    old = old.astype(object)
+    new = new.astype(object)
+    return (old != new) & ~(old.isna() & new.isna())
+
+
+def _history_changed(old, new):
+    """
+    True for every voter whose vote history differs: a changed cell in an election both
+    snapshots carry, or any ballot in an election only the new snapshot has.
+    old and new hold the same voters in the same order.
+    """
+    old_history = VoteHistory.from_frame(old)
+    new_history = VoteHistory.from_frame(new)
+    old_columns = list(old_history.elections["column"])
+    new_columns = list(new_history.elections["column"])
+    common = [col for col in new_columns if col in old_columns]
+
+    # Translate old codes into the new snapshot's label numbering before comparing.
+    translate = np.array(
+        [new_history.labels.index(label) if label in new_history.labels else 255 for label in old_history.labels],
+        dtype=np.uint8,
+    )
+    old_codes = translate[old_history.codes[:, [old_columns.index(col) for col in common]]]
+    new_codes = new_history.codes[:, [new_columns.index(col) for col in common]]
+    changed = (old_codes != new_codes).any(axis=1)
+
+    added = np.array([col not in old_columns for col in new_columns], dtype=bool)
+    if added.any():
+        changed |= new_history.count(elections=added) > 0
+    return changed
+
+
+def _other_columns(frame):
+    """
+    The columns no other kind of change covers: everything but the key, scores, elections,
+    place and address.
+    """
+    skip = {KEY, *SCORE_COLUMNS, *PLACE_COLUMNS, *ADDRESS_COLUMNS, *election_table(frame.columns)["column"]}
+    return [col for col in frame.columns if col not in skip]
+
+
+def _row_hash(frame, columns):
+    """
+    One 64-bit hash per row of frame[columns], independent of the columns' dtypes.
+    """
+    values = frame[columns].astype(object).where(frame[columns].notna(), None)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots keyed on SOS_VOTERID and return the delta report: one row per
+    changed voter and kind of change (see CHANGE_KINDS), with the voter's old and new WARD.
+    """
+    old = old[old[KEY].notna()].drop_duplicates(KEY, keep="last").set_index(KEY)
+    new = new[new[KEY].notna()].drop_duplicates(KEY, keep="last").set_index(KEY)
+    common = new.index.intersection(old.index)
+    old_common = old.loc[common]
+    new_common = new.loc[common]
+
+    changes = {
+        "added": new.index.difference(old.index),
+        "removed": old.index.difference(new.index),
+    }
+    moved = np.zeros(len(common), dtype=bool)
+    for col in PLACE_COLUMNS:
+        if col in old.columns and col in new.columns:
+            moved |= _differs(old_common[col], new_common[col]).to_numpy()
+    changes["moved"] = common[moved]
+    changes["voted"] = common[_history_changed(old_common, new_common)]
+    address = np.zeros(len(common), dtype=bool)
+    for col in ADDRESS_COLUMNS:
+        if col in old.columns and col in new.columns:
+            address |= _differs(old_common[col], new_common[col]).to_numpy()
+    changes["address"] = common[address]
+    # Any other column (and so any cell of the exported rows) differs: compare one hash per
+    # row instead of every column. A column added or dropped changes every row.
+    other = _other_columns(new)
+    if other == _other_columns(old):
+        changed = _row_hash(old_common, other) != _row_hash(new_common, other)
+    else:
+        changed = np.ones(len(common), dtype=bool)
+    changes["changed"] = common[changed]
+
+    parts = []
+    for kind in CHANGE_KINDS:
+        ids = changes[kind]
+        parts.append(pd.DataFrame({
+            KEY: ids,
+            "CHANGE": kind,
+            "WARD_OLD": old["WARD"].astype(object).reindex(ids).to_numpy(),
+            "WARD_NEW": new["WARD"].astype(object).reindex(ids).to_numpy(),
+        }))
+    delta = pd.concat(parts, ignore_index=True)
+    delta["CHANGE"] = pd.Categorical(delta["CHANGE"], categories=CHANGE_KINDS)
+    return delta
+
+
+def affected_wards(delta):
+    """
+    Wards whose output files must be regenerated for this delta (old and new WARD).
+    """
+    wards = pd.concat([delta["WARD_OLD"], delta["WARD_NEW"]]).dropna().unique()
+    return sorted(wards)
+
+
+def rescore_changed(new, previous, delta, current_year=None, previous_year=None):
+    """
+    Score the new snapshot, reusing the previous snapshot's scores for every voter the delta
+    does not mention and scoring only the rest. Everyone is rescored when an election column
+    was dropped or the scoring year moved on, since that shifts every score.
+    Returns (scored frame, number of voters rescored).
+    """
+    if current_year is None:
+        current_year = datetime.today().year
+    old_elections = set(election_table(previous.columns)["column"])
+    new_elections = set(election_table(new.columns)["column"])
+    if previous_year != current_year or not old_elections <= new_elections:
+        return insert_scores(new, compute_scores(new, current_year=current_year)), len(new)
+
+    previous_scores = previous.drop_duplicates(KEY, keep="last").set_index(KEY)[SCORE_COLUMNS]
+    ids = new[KEY]
+    reuse = (ids.isin(previous_scores.index) & ~ids.isin(delta[KEY])).to_numpy()
+
+    scores = pd.DataFrame(0, index=new.index, columns=SCORE_COLUMNS, dtype="int64")
+    scores.loc[reuse] = previous_scores.loc[ids[reuse]].to_numpy()
+    if (~reuse).any():
+        scores.loc[~reuse] = compute_scores(new[~reuse], current_year=current_year).to_numpy()
+    return insert_scores(new, scores), int((~reuse).sum())
+
+
+def save_snapshot(df, name, current_year=None, cache_dir=CACHE_DIR, files=None, options=None):
+    """
+    Keep df (a scored snapshot) as the previous snapshot for the next incremental run.
+    files maps each output file's dateless name to the file written for it (see
+    voter_export.carry_forward), so the next run can reuse the files of unchanged wards;
+    options are the output options those files were written with, which must match for that.
+    Returns the snapshot's id, which state derived from it (e.g. rollups) is tagged with.
+    """
+    from pyarrow import feather
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"snapshot-{name}.feather")
+    feather.write_feather(df.reset_index(drop=True), path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+    meta = {"id": uuid.uuid4().hex, "saved": datetime.today().isoformat(timespec="seconds"),
+            "score_year": current_year or datetime.today().year, "rows": len(df), "files": files or {},
+            "options": options or {}}
+    with open(os.path.join(cache_dir, f"snapshot-{name}.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    return meta["id"]
+
+
+def snapshot_meta(name, cache_dir=CACHE_DIR):
+    """
+    The metadata saved with the previous snapshot: id, saved, score_year, rows, files,
+    options ({} when there is none).
+    """
+    try:
+        with open(os.path.join(cache_dir, f"snapshot-{name}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def snapshot_files(name, cache_dir=CACHE_DIR):
+    """
+    The output files recorded with the previous snapshot ({} when there are none).
+    """
+    return snapshot_meta(name, cache_dir).get("files", {})
+
+
+def load_snapshot(name, cache_dir=CACHE_DIR):
+    """
+    Return (previous scored snapshot, its score year), or (None, None) when there is none.
+    """
+    path = os.path.join(cache_dir, f"snapshot-{name}.feather")
+    if not os.path.exists(path):
+        return None, None
+    from pyarrow import feather
+
+    with open(os.path.join(cache_dir, f"snapshot-{name}.json")) as f:
+        meta = json.load(f)
+    return feather.read_table(path, memory_map=True).to_pandas(), meta["score_year"]
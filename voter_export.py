@@ -0,0 +1,263 @@
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+from addresses import street_names
+from profiling import current_rss_mb, rss_delta_mb
+from voter_schema import header_schema
+from voter_scores import LATEST_YEARS, SCORE_COLUMNS, add_scores
+from xlsx_stream import write_xlsx
+
+EXPORT_FORMATS = ["xlsx", "csv", "parquet"]
+
+
+def display_text(df):
+    """
+    The DISPLAY value of every row as literal text ("ROWLEY 1947T=39D=8R=2M=7L=10B=16"), the
+    same string the CONCATENATE formula shows. DATE_OF_BIRTH must already be text.
+    """
+    text = lambda col: df[col].astype(object).fillna("").astype(str) if col in df.columns else ""
+    return (text("LAST_NAME") + " " + text("DATE_OF_BIRTH").str[:4]
+            + "T=" + text("Total:") + "D=" + text("Dems") + "R=" + text("REPS")
+            + "M=" + text("Muni") + "L=" + text("Latest") + "B=" + text("Both"))
+
+
+def vote_formulas(row, first, last, odd_year):
+    """
+    The Total:, Dems, REPS and Muni formulas postprocess_excel writes for one sheet row, given
+    the letters of the first and last vote columns and of the odd-year PRIMARY columns.
+    """
+    vote_range = f"${first}${row}:${last}${row}"
+    muni = "+".join(f'IF({letter}{row}="D",1,0)' for letter in odd_year)
+    return [f"=COUNTA({vote_range})", f'=COUNTIF({vote_range},"D")', f'=COUNTIF({vote_range},"R")',
+            "=" + muni if muni else "=0"]
+
+
+def build_output_frame(df, formulas=False):
+    """
+    Arrange df into the final workbook layout in memory:
+      - the score block (Total:, Dems, REPS, Muni, Latest, Both) right after WARD
+      - DISPLAY right after FIRST_NAME:
+            LAST_NAME + " " + LEFT(DATE_OF_BIRTH,4) + "T=" + Total + "D=" + Dems + "R=" + REPS + "M=" + Muni + "L=" + Latest + "B=" + Both
+      - StreetName right after RESIDENTIAL_ADDRESS1
+    The scores, DISPLAY and StreetName are literal values, so any reader sees them. With
+    formulas they are all Excel formulas instead (the scores as postprocess_excel writes them,
+    see vote_formulas), built from the final column letters so they never point at a shifted
+    column. The frame's row order is the row order of the sheet.
+    """
+    if not all(col in df.columns for col in SCORE_COLUMNS):
+        df = add_scores(df)
+    out = df.copy()
+    # Dates from the typed cache go back to the SOS text form, which LEFT(...,4) relies on.
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%d")
+
+    # Insert both columns first so every letter below is a final position.
+    if "FIRST_NAME" in out.columns:
+        out.insert(out.columns.get_loc("FIRST_NAME") + 1, "DISPLAY", "")
+    # A StreetName the frame already carries (parsed in Python, e.g. by walk_lists) is kept as is.
+    add_street = "RESIDENTIAL_ADDRESS1" in out.columns and "StreetName" not in out.columns
+    if add_street:
+        out.insert(out.columns.get_loc("RESIDENTIAL_ADDRESS1") + 1, "StreetName", "")
+
+    if not formulas:
+        if "DISPLAY" in out.columns:
+            out["DISPLAY"] = display_text(out)
+        if add_street:
+            out["StreetName"] = street_names(out["RESIDENTIAL_ADDRESS1"])
+        return out
+
+    schema = header_schema(out.columns)
+
+    def letter(name):
+        position = schema.position(name)
+        return get_column_letter(position + 1) if position is not None else ""
+
+    rows = range(2, len(out) + 2)
+    letters = lambda elections: [get_column_letter(e.position + 1) for e in elections]
+    first, last = letters([schema.elections[0], schema.elections[-1]])
+    odd_year = letters(schema.select(types=["PRIMARY"], odd_year=True))
+    latest = letters(schema.select(types=["PRIMARY", "SPECIAL"], min_year=datetime.today().year - LATEST_YEARS))
+    dems, reps = letter("Dems"), letter("REPS")
+    score_formulas = [
+        vote_formulas(r, first, last, odd_year)
+        + ["=" + ("+".join(f'IF({col}{r}<>"",1,0)' for col in latest) or "0"),
+           f"=IF(AND({dems}{r}>0,{reps}{r}>0),1,0)"]
+        for r in rows
+    ]
+    out[SCORE_COLUMNS] = pd.DataFrame(score_formulas, index=out.index, columns=SCORE_COLUMNS, dtype=object)
+    if "DISPLAY" in out.columns:
+        last_name, dob = letter("LAST_NAME"), letter("DATE_OF_BIRTH")
+        total, dems, reps, muni, latest, both = (letter(col) for col in SCORE_COLUMNS)
+        out["DISPLAY"] = [
+            f'=CONCATENATE({last_name}{r}," ",LEFT({dob}{r},4),"T=",'
+            f'{total}{r},"D=",{dems}{r},"R=",{reps}{r},"M=",{muni}{r},"L=",{latest}{r},"B=",{both}{r})'
+            for r in rows
+        ]
+    if add_street:
+        address = letter("RESIDENTIAL_ADDRESS1")
+        out["StreetName"] = [
+            f'=RIGHT({address}{r},LEN({address}{r})-FIND(" ",{address}{r}))' for r in rows
+        ]
+    return out
+
+
+def write_voter_workbook(df, filename, formulas=False):
+    """
+    Write df in its final layout to filename in a single pass, streaming the sheet through
+    xlsx_stream. Nothing is reopened or shifted after the write. Values are literal unless
+    formulas is set (see build_output_frame).
+    """
+    out = build_output_frame(df, formulas)
+    write_xlsx(out, filename, formula_columns=[*SCORE_COLUMNS, "DISPLAY", "StreetName"] if formulas else ())
+    print(f"Data written to {filename} ({len(out)} rows)")
+
+
+def write_voter_csv(df, filename):
+    build_output_frame(df).to_csv(filename, index=False)
+    print(f"Data written to {filename} ({len(df)} rows)")
+
+
+def write_voter_parquet(df, filename):
+    """
+    Write df in its final layout to a Parquet file (needs pyarrow). Object columns are
+    written as text, so a column mixing numbers and blanks still has one type.
+    """
+    out = build_output_frame(df)
+    for col in out.columns:
+        if out[col].dtype == object:
+            out[col] = out[col].map(lambda v: None if pd.isna(v) else str(v))
+    out.to_parquet(filename, index=False)
+    print(f"Data written to {filename} ({len(out)} rows)")
+
+
+def get_writer(fmt, formulas=False):
+    """
+    The writer(df, filename) for one of EXPORT_FORMATS. formulas only applies to xlsx,
+    the one format that can carry them.
+    """
+    if fmt == "xlsx":
+        return partial(write_voter_workbook, formulas=True) if formulas else write_voter_workbook
+    if fmt == "csv":
+        return write_voter_csv
+    if fmt == "parquet":
+        return write_voter_parquet
+    raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+
+
+def with_format(filename, fmt):
+    """
+    filename with its extension replaced by fmt's ("CityOfWarren.xlsx" -> "CityOfWarren.csv").
+    """
+    return f"{os.path.splitext(filename)[0]}.{fmt}"
+
+
+def dateless_name(filename, date_str):
+    """
+    filename with date_str replaced by "{date}": the name of the same file on any day.
+    """
+    return filename.replace(date_str, "{date}")
+
+
+def carry_forward(previous_files, ward_filename, wards, formats, date_str):
+    """
+    Give each ward in wards today's file without writing it again: the file an earlier run
+    wrote (previous_files, dateless name -> filename) is copied to today's name. A copy, not
+    a hard link, so writing or editing one day's file never changes another's.
+    Returns ({dateless name: filename} of the files carried forward, wards that had no
+    earlier file and must be written).
+    """
+    carried, missing = {}, set()
+    for fmt in formats:
+        for ward in wards:
+            filename = with_format(ward_filename.format(ward=ward), fmt)
+            key = dateless_name(filename, date_str)
+            previous = previous_files.get(key)
+            if not previous or not os.path.exists(previous):
+                missing.add(ward)
+                continue
+            if os.path.abspath(previous) != os.path.abspath(filename):
+                # Remove first: today's name may still be a hard link to previous from an older run.
+                if os.path.exists(filename):
+                    os.remove(filename)
+                shutil.copy2(previous, filename)
+            carried[key] = filename
+    if carried:
+        print(f"Carried forward {len(carried)} unchanged ward files")
+    return carried, sorted(missing)
+
+
+def _timed_write(writer, df, filename, label):
+    start, cpu, rss = time.perf_counter(), time.process_time(), current_rss_mb()
+    writer(df, filename)
+    return label, filename, len(df), time.perf_counter() - start, time.process_time() - cpu, rss_delta_mb(rss)
+
+
+def export_wards(sorted_df, overall_filename, ward_filename, workers=1, writer=write_voter_workbook, only_wards=None):
+    """
+    Write the citywide file plus one file per WARD. ward_filename is a format string with a
+    {ward} field. The frame is partitioned once with groupby("WARD"); with workers > 1 each
+    file is written by writer(df, filename) in its own process. only_wards restricts the
+    ward files written (the citywide file is always written).
+    Prints and returns (label, filename, rows, seconds, cpu_seconds, rss_delta_mb) for every
+    file written; CPU and the RSS change are those of the process that wrote it.
+    """
+    jobs = [("CITY", sorted_df, overall_filename)]
+    for ward, ward_df in sorted_df.groupby("WARD", sort=False, observed=True):
+        if only_wards is None or ward in only_wards:
+            jobs.append((ward, ward_df, ward_filename.format(ward=ward)))
+
+    # The calling scripts run at import time, so workers must be forked rather than spawned
+    # (a spawned worker would re-run the whole script, browser download included).
+    if workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        print("Process pool needs the 'fork' start method; writing files serially.")
+        workers = 1
+
+    timings = []
+    start = time.perf_counter()
+    if workers > 1:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(_timed_write, writer, df, filename, label): label
+                for label, df, filename in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    timings.append(future.result())
+                except Exception as e:
+                    print(f"Error saving Excel file for ward '{futures[future]}': {e}")
+    else:
+        for label, df, filename in jobs:
+            try:
+                timings.append(_timed_write(writer, df, filename, label))
+            except Exception as e:
+                print(f"Error saving Excel file for ward '{label}': {e}")
+    elapsed = time.perf_counter() - start
+
+    for label, filename, rows, seconds, _, _ in timings:
+        print(f"  {label:<16} {rows:>7} rows {seconds:8.2f}s  {filename}")
+    print(f"Exported {len(timings)} files in {elapsed:.2f}s with {workers} worker(s)")
+    return timings
+
+
+def export_formats(sorted_df, overall_filename, ward_filename, formats=("xlsx",), formulas=False, wrap=None, **kwargs):
+    """
+    export_wards once per format in formats (see EXPORT_FORMATS), each with the filenames'
+    extension swapped for the format's. wrap, when given, wraps every writer (e.g. in a
+    ProfiledWriter). Returns the timings of every file written.
+    """
+    timings = []
+    for fmt in formats:
+        writer = get_writer(fmt, formulas)
+        timings += export_wards(sorted_df, with_format(overall_filename, fmt), with_format(ward_filename, fmt),
+                                writer=wrap(writer) if wrap else writer, **kwargs)
+    return timings
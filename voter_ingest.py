@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from voter_schema import ELECTION_HEADER
+
+# Rows parsed at a time by the streaming reader.
+CHUNK_ROWS = 50000
+
+# Typed copies of downloaded SOS files live here, named by the file's content hash.
+CACHE_DIR = os.path.join(os.getcwd(), "cache")
+CACHE_INDEX = "index.json"
+# Part of every cached copy's name: bump it whenever read_voter_csv/apply_voter_types change
+# how a file is parsed or typed, so copies made by the old code are not served again.
+CACHE_VERSION = 1
+
+# Columns read as text even when they look numeric.
+TEXT_COLUMNS = ["SOS_VOTERID"]
+DATE_COLUMNS = ["DATE_OF_BIRTH", "REGISTRATION_DATE"]
+# Low-cardinality columns that repeat the same few values across the county.
+CATEGORY_COLUMNS = [
+    "VOTER_STATUS", "PARTY_AFFILIATION",
+    "RESIDENTIAL_CITY", "RESIDENTIAL_STATE", "RESIDENTIAL_COUNTRY",
+    "MAILING_CITY", "MAILING_STATE", "MAILING_COUNTRY",
+    "CAREER_CENTER", "CITY", "CITY_SCHOOL_DISTRICT", "COUNTY_COURT_DISTRICT",
+    "CONGRESSIONAL_DISTRICT", "COURT_OF_APPEALS", "EDU_SERVICE_CENTER_DISTRICT",
+    "EXEMPTED_VILL_SCHOOL_DISTRICT", "LIBRARY", "LOCAL_SCHOOL_DISTRICT",
+    "MUNICIPAL_COURT_DISTRICT", "PRECINCT_NAME", "PRECINCT_CODE",
+    "STATE_BOARD_OF_EDUCATION", "STATE_REPRESENTATIVE_DISTRICT", "STATE_SENATE_DISTRICT",
+    "TOWNSHIP", "VILLAGE", "WARD",
+]
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_category_column(name):
+    return bool(ELECTION_HEADER.match(name)) or name in CATEGORY_COLUMNS
+
+
+def voter_dtypes(columns):
+    """
+    Map the SOS header to the dtypes it is parsed with: vote-history, district and ID
+    columns as text. Columns not listed are left to pandas' inference.
+    """
+    dtypes = {}
+    for col in columns:
+        name = col.strip().upper()
+        if is_category_column(name) or name in TEXT_COLUMNS:
+            dtypes[col] = str
+    return dtypes
+
+
+def apply_voter_types(df):
+    """
+    Normalize column names (trim and convert to uppercase), turn vote-history and district
+    columns into categoricals and parse dates to datetime64.
+    """
+    df.columns = df.columns.str.strip().str.upper()
+    for col in df.columns:
+        if is_category_column(col):
+            df[col] = df[col].astype("category")
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def read_voter_csv(path):
+    """
+    Parse an SOS county export with explicit dtypes (see apply_voter_types).
+    """
+    header = pd.read_csv(path, delimiter=",", nrows=0).columns
+    df = pd.read_csv(path, delimiter=",", dtype=voter_dtypes(header))
+    return apply_voter_types(df)
+
+
+def read_filtered_voters(path, column, pattern, usecols=None, chunksize=CHUNK_ROWS):
+    """
+    Stream an SOS county export chunk by chunk, keeping only the rows whose column contains
+    pattern (case-insensitive), e.g. ("WARD", "WARREN-WARD") or ("CITY", "WARREN CITY").
+    Only the matching rows are ever concatenated, so peak memory follows the size of the
+    subset rather than the county. usecols limits the columns parsed (names are matched
+    trimmed and upper-case; the filter column is always read). path may also be a
+    seekable text buffer.
+    """
+    start = path.tell() if hasattr(path, "seek") else None
+    header = pd.read_csv(path, delimiter=",", nrows=0).columns
+    if start is not None:
+        path.seek(start)
+
+    selected = None
+    if usecols is not None:
+        wanted = {name.strip().upper() for name in usecols} | {column}
+        selected = [col for col in header if col.strip().upper() in wanted]
+
+    parts = []
+    reader = pd.read_csv(path, delimiter=",", dtype=voter_dtypes(header), usecols=selected, chunksize=chunksize)
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip().str.upper()
+        parts.append(chunk[chunk[column].str.contains(pattern, case=False, na=False, regex=False)])
+    if not parts:
+        # A file with a header and no rows yields no chunks at all.
+        names = [col for col in header if selected is None or col in selected]
+        parts.append(pd.DataFrame(columns=pd.Index(names).str.strip().str.upper(), dtype=object))
+    return apply_voter_types(pd.concat(parts, ignore_index=True))
+
+
+def _load_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, CACHE_INDEX)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_file_hash(path, cache_dir=CACHE_DIR):
+    """
+    Return the sha256 of path, re-hashing only when its size or mtime changed since the
+    last time it was seen.
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    index = _load_index(cache_dir)
+    entry = index.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    sha256 = file_sha256(path)
+    index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+    os.makedirs(cache_dir, exist_ok=True)
+    # Batch workers may hash files at the same time: each writes its own temp file and swaps
+    # it in whole, so a reader never sees a half-written index.
+    index_path = os.path.join(cache_dir, CACHE_INDEX)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, index_path)
+    return sha256
+
+
+def load_voter_file(path, cache_dir=CACHE_DIR):
+    """
+    Load an SOS county export through the columnar cache. The first load parses the CSV
+    and writes an uncompressed Feather copy keyed by the file's hash and CACHE_VERSION;
+    later loads of the same file memory-map that copy instead of re-parsing. Without pyarrow the CSV is
+    parsed every time.
+    """
+    try:
+        from pyarrow import feather
+    except ImportError:
+        print("pyarrow is not installed; reading the CSV without the cache.")
+        return read_voter_csv(path)
+
+    cache_path = os.path.join(cache_dir, f"{cached_file_hash(path, cache_dir)[:20]}-v{CACHE_VERSION}.feather")
+    if os.path.exists(cache_path):
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df = read_voter_csv(path)
+    tmp_path = cache_path + ".tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+    print(f"Cached {path} as {cache_path}")
+    return df
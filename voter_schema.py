@@ -0,0 +1,115 @@
+import re
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple
+
+import pandas as pd
+
+# Vote-history headers look like "PRIMARY-03/07/2000", "GENERAL-11/05/2024", "SPECIAL-01/07/2025".
+ELECTION_HEADER = re.compile(r"^(PRIMARY|GENERAL|SPECIAL)-(\d{2})/(\d{2})/(\d{4})$")
+
+# The SOS identity and district fields the scripts look up by name.
+IDENTITY_COLUMNS = ["SOS_VOTERID", "COUNTY_ID", "LAST_NAME", "FIRST_NAME", "DATE_OF_BIRTH", "REGISTRATION_DATE",
+                    "VOTER_STATUS", "PARTY_AFFILIATION", "RESIDENTIAL_ADDRESS1", "RESIDENTIAL_SECONDARY_ADDR",
+                    "RESIDENTIAL_ZIP", "CITY", "PRECINCT_NAME", "WARD"]
+
+
+class Election(NamedTuple):
+    column: str      # the header as it appears in the file
+    position: int    # 0-based column position
+    type: str        # PRIMARY, GENERAL or SPECIAL
+    date: date
+
+    @property
+    def year(self):
+        return self.date.year
+
+    @property
+    def odd_year(self):
+        return self.date.year % 2 == 1
+
+
+class HeaderSchema:
+    """
+    A voter-file header parsed once: where every column is (looked up trimmed and upper-case)
+    and the elections of the vote history, in file order. Build it with header_schema, which
+    returns the same object for the same header.
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.positions = {}
+        elections = []
+        for position, col in enumerate(self.columns):
+            name = str(col).strip().upper()
+            self.positions.setdefault(name, position)
+            match = ELECTION_HEADER.match(name)
+            if match:
+                kind, month, day, year = match.groups()
+                elections.append(Election(col, position, kind, date(int(year), int(month), int(day))))
+        self.elections = tuple(elections)
+        self._table = None
+
+    def position(self, name):
+        """
+        0-based position of a column by name (case and surrounding spaces ignored), or None.
+        """
+        return self.positions.get(name.strip().upper())
+
+    def column(self, name):
+        position = self.position(name)
+        return None if position is None else self.columns[position]
+
+    @property
+    def identity(self):
+        """
+        {field: position} for the IDENTITY_COLUMNS this header has.
+        """
+        return {name: self.positions[name] for name in IDENTITY_COLUMNS if name in self.positions}
+
+    def select(self, types=None, min_year=None, odd_year=None):
+        """
+        The elections matching every given condition, e.g. select(types=["PRIMARY"], odd_year=True).
+        """
+        return [
+            e for e in self.elections
+            if (types is None or e.type in types)
+            and (min_year is None or e.year >= min_year)
+            and (odd_year is None or e.odd_year == odd_year)
+        ]
+
+    def election_table(self):
+        """
+        The elections as a DataFrame: column, type, date, year, odd_year (one row each, in
+        file order). Built once per schema; callers get a copy.
+        """
+        if self._table is None:
+            table = pd.DataFrame(
+                [(e.column, e.type, pd.Timestamp(e.date), e.year) for e in self.elections],
+                columns=["column", "type", "date", "year"],
+            )
+            table["year"] = table["year"].astype("int64")
+            table["odd_year"] = table["year"] % 2 == 1
+            self._table = table
+        return self._table.copy()
+
+
+@lru_cache(maxsize=64)
+def _cached_schema(columns):
+    return HeaderSchema(columns)
+
+
+def header_schema(columns):
+    """
+    The HeaderSchema of a header (any sequence of column names). Parsed once per distinct
+    header and shared by scoring, display and export.
+    """
+    return _cached_schema(tuple(columns))
+
+
+def election_table(columns):
+    """
+    Parse the vote-history headers into one row per election, in file order:
+    column, type (PRIMARY/GENERAL/SPECIAL), date, year, odd_year.
+    """
+    return header_schema(columns).election_table()
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pandas as pd
+
+from vote_history import VoteHistory
+
+# Header labels of the score block, in the order they sit after WARD.
+SCORE_COLUMNS = ["Total:", "Dems", "REPS", "Muni", "Latest", "Both"]
+
+# "Latest" counts votes cast within this many years of the current year.
+LATEST_YEARS = 6
+
+
+def compute_scores(df, current_year=None, history=None):
+    """
+    Compute the six voter scores for every row of df as plain integers:
+      1. Total:  nonblank vote columns
+      2. Dems:   vote columns equal to "D"
+      3. REPS:   vote columns equal to "R"
+      4. Muni:   odd-year PRIMARY columns equal to "D"
+      5. Latest: nonblank PRIMARY/SPECIAL columns with year >= current_year - 6
+      6. Both:   1 if Dems > 0 and REPS > 0, else 0
+    These match the formulas postprocess_excel used to write, but are evaluated once
+    over the encoded vote matrix instead of per row in Excel. Pass history to reuse a
+    VoteHistory already built for df.
+    Returns a DataFrame with SCORE_COLUMNS, aligned to df.index.
+    """
+    if current_year is None:
+        current_year = datetime.today().year
+    if history is None:
+        history = VoteHistory.from_frame(df)
+    if not len(history.elections):
+        raise KeyError("No PRIMARY-/GENERAL-/SPECIAL- vote columns found in the header.")
+
+    muni_mask = history.election_mask(types=["PRIMARY"], odd_year=True)
+    latest_mask = history.election_mask(types=["PRIMARY", "SPECIAL"], min_year=current_year - LATEST_YEARS)
+
+    dem_count = history.count("D")
+    rep_count = history.count("R")
+    scores = pd.DataFrame(
+        {
+            "Total:": history.count(),
+            "Dems": dem_count,
+            "REPS": rep_count,
+            "Muni": history.count("D", elections=muni_mask),
+            "Latest": history.count(elections=latest_mask),
+            "Both": (dem_count > 0) & (rep_count > 0),
+        },
+        index=df.index,
+    )
+    return scores.astype("int64")
+
+
+def add_scores(df, current_year=None, history=None):
+    """
+    Return a copy of df with the score block inserted immediately to the right of WARD,
+    which is where postprocess_excel puts the formula columns.
+    """
+    return insert_scores(df, compute_scores(df, current_year=current_year, history=history))
+
+
+def insert_scores(df, scores):
+    """
+    Return a copy of df with the SCORE_COLUMNS of scores (aligned to df.index) placed right
+    after WARD, replacing any score block df already has.
+    """
+    scored_df = df.drop(columns=[c for c in SCORE_COLUMNS if c in df.columns])
+    position = scored_df.columns.get_loc("WARD") + 1
+    for offset, col in enumerate(SCORE_COLUMNS):
+        scored_df.insert(position + offset, col, scores[col])
+    return scored_df
@@ -0,0 +1,162 @@
+"""
+Fuzzy voter search over names, birth year and address, e.g. "1256 arthur" or "toles 1959".
+
+Every word of LAST_NAME, FIRST_NAME, RESIDENTIAL_ADDRESS1 and the DATE_OF_BIRTH year is a
+token. A query word matches tokens exactly, as a prefix ("ARTH" -> ARTHUR) or, for words
+of letters, by trigram similarity so misspellings still hit ("TOWLES" -> TOLES). A voter
+must match every query word; the best-matching voters come first, with their scores.
+"""
+import bisect
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from voter_scores import SCORE_COLUMNS
+
+NAME_FIELDS = ["LAST_NAME", "FIRST_NAME", "RESIDENTIAL_ADDRESS1"]
+RESULT_COLUMNS = ["SOS_VOTERID", "LAST_NAME", "FIRST_NAME", "DATE_OF_BIRTH", "RESIDENTIAL_ADDRESS1",
+                  "RESIDENTIAL_SECONDARY_ADDR", "RESIDENTIAL_CITY", "PRECINCT_NAME", "WARD"] + SCORE_COLUMNS
+# Query words that say what is asked rather than who.
+STOPWORDS = {"WHO", "LIVES", "LIVING", "AT", "BORN", "IN", "ON", "THE", "OF", "NAMED"}
+
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+# Smallest trigram similarity (shared / union) that counts as a misspelling.
+FUZZY_MIN = 0.35
+
+
+def _words(values):
+    return pd.Series(values, copy=False).astype(object).fillna("").astype(str).str.upper().str.findall(r"[A-Z0-9]+")
+
+
+def _trigrams(token):
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class VoterSearchIndex:
+    """
+    Inverted index from token to voters (CSR arrays), a sorted vocabulary for prefix lookups
+    and a trigram index over the vocabulary for fuzzy lookups. Holds its own copy of the
+    result columns, so a search never touches the voter file.
+    """
+
+    def __init__(self, vocabulary, indptr, rows, trigrams, trigram_counts, results):
+        self.vocabulary = vocabulary          # sorted list of tokens
+        self.indptr = indptr                  # token i's voters are rows[indptr[i]:indptr[i + 1]]
+        self.rows = rows
+        self.trigrams = trigrams              # trigram -> array of token ids
+        self.trigram_counts = trigram_counts  # trigrams per token
+        self.results = results
+
+    @classmethod
+    def build(cls, df):
+        df = df.reset_index(drop=True)
+        fields = [_words(df[col]) for col in NAME_FIELDS if col in df.columns]
+        if "DATE_OF_BIRTH" in df.columns:
+            dob = df["DATE_OF_BIRTH"]
+            years = dob.dt.year if pd.api.types.is_datetime64_any_dtype(dob) else \
+                pd.to_numeric(dob.astype(object).astype(str).str[:4], errors="coerce")
+            fields.append(years.map(lambda y: [] if pd.isna(y) else [str(int(y))]))
+        pairs = pd.concat([words.explode().dropna() for words in fields])
+        pairs = pairs[pairs != ""]
+        pairs = pd.DataFrame({"row": pairs.index.to_numpy(np.int32), "token": pairs.to_numpy()}).drop_duplicates()
+
+        token_ids, vocabulary = pd.factorize(pairs["token"], sort=True)
+        order = np.argsort(token_ids, kind="stable")
+        rows = pairs["row"].to_numpy()[order]
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(token_ids, minlength=len(vocabulary)), out=indptr[1:])
+
+        trigram_lists = {}
+        trigram_counts = np.zeros(len(vocabulary), dtype=np.int32)
+        for token_id, token in enumerate(vocabulary):
+            if token.isdigit():
+                continue
+            grams = _trigrams(token)
+            trigram_counts[token_id] = len(grams)
+            for gram in grams:
+                trigram_lists.setdefault(gram, []).append(token_id)
+        trigrams = {gram: np.array(ids, dtype=np.int32) for gram, ids in trigram_lists.items()}
+
+        results = df[[col for col in RESULT_COLUMNS if col in df.columns]].copy()
+        for col in results.columns:
+            if pd.api.types.is_datetime64_any_dtype(results[col]):
+                results[col] = results[col].dt.strftime("%Y-%m-%d")
+            elif isinstance(results[col].dtype, pd.CategoricalDtype):
+                results[col] = results[col].astype(object)
+            if results[col].dtype == object:
+                results[col] = results[col].fillna("")
+        return cls(list(vocabulary), indptr, rows, trigrams, trigram_counts, results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def match_term(self, term):
+        """
+        {token id: weight} for one query word: exact, prefix and (for words of letters)
+        trigram-similar tokens.
+        """
+        weights = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token_id in range(start, len(self.vocabulary)):
+            token = self.vocabulary[token_id]
+            if not token.startswith(term):
+                break
+            weights[token_id] = EXACT if token == term else PREFIX
+        if not term.isdigit() and len(term) >= 3:
+            grams = [self.trigrams[g] for g in _trigrams(term) if g in self.trigrams]
+            if grams:
+                shared = np.bincount(np.concatenate(grams), minlength=len(self.vocabulary))
+                candidates = np.flatnonzero(shared)
+                similarity = shared[candidates] / (len(_trigrams(term)) + self.trigram_counts[candidates]
+                                                   - shared[candidates])
+                for token_id, score in zip(candidates[similarity >= FUZZY_MIN], similarity[similarity >= FUZZY_MIN]):
+                    weights.setdefault(int(token_id), FUZZY * float(score))
+        return weights
+
+    def search(self, query, limit=20):
+        """
+        The voters matching every word of query, best first, as a DataFrame of RESULT_COLUMNS
+        plus MATCH (the summed word weights).
+        """
+        terms = [t for t in _words([query]).iloc[0] if t not in STOPWORDS]
+        if not terms:
+            return self.results.iloc[:0].assign(MATCH=[])
+        total = np.zeros(len(self), dtype=np.float32)
+        matched = np.ones(len(self), dtype=bool)
+        for term in terms:
+            best = np.zeros(len(self), dtype=np.float32)
+            for token_id, weight in self.match_term(term).items():
+                np.maximum.at(best, self.rows[self.indptr[token_id]:self.indptr[token_id + 1]], weight)
+            matched &= best > 0
+            total += best
+        hits = np.flatnonzero(matched)
+        hits = hits[np.argsort(-total[hits], kind="stable")[:limit]]
+        return self.results.iloc[hits].assign(MATCH=total[hits].round(2))
+
+    def save(self, path):
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def load_or_build_index(df_loader, source, path):
+    """
+    The index saved at path when it is newer than source, otherwise one built from
+    df_loader() and saved there.
+    """
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return VoterSearchIndex.load(path)
+    start = time.perf_counter()
+    index = VoterSearchIndex.build(df_loader())
+    index.save(path)
+    print(f"Indexed {len(index)} voters in {time.perf_counter() - start:.2f}s ({path})")
+    return index
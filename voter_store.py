@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Embedded SQLite store of the filtered, scored voters, indexed for targeting queries, with
+saved target definitions that export straight to xlsx or csv.
+
+    python voter_store.py load downloads/county-78.txt
+    python voter_store.py save-target dem-regulars "Dems >= 3 AND Latest >= 2" -d "Regular D primary voters"
+    python voter_store.py query dem-regulars --output dem-regulars.xlsx
+    python voter_store.py query --where "WARD = 'WARREN-WARD 3' AND Both = 1" --output ward3-both.csv
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from voter_ingest import CACHE_DIR
+from voter_scores import SCORE_COLUMNS
+
+STORE_DB = "voters.sqlite"
+
+# Every column here gets its own index; score columns are indexed one by one as well.
+INDEXED_COLUMNS = ["WARD", "PRECINCT_NAME", "StreetName", "PARTY_AFFILIATION"] + SCORE_COLUMNS
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _index_name(column):
+    return "idx_voters_" + "".join(c if c.isalnum() else "_" for c in column).strip("_").lower()
+
+
+class VoterStore:
+    """
+    The voters table plus the saved targets (name -> SQL WHERE clause over voters).
+    Column names are the voter file's; those that are not plain identifiers ("Total:",
+    "PRIMARY-03/07/2000") need double quotes in a WHERE clause.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, STORE_DB)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS targets (name TEXT PRIMARY KEY, where_clause TEXT, description TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def load(self, df, source=""):
+        """
+        Replace the voters table with df (scored, in its final row order) and index it.
+        StreetName is parsed from RESIDENTIAL_ADDRESS1 when df does not carry it.
+        """
+        from addresses import street_names
+
+        df = df.copy()
+        if "StreetName" not in df.columns and "RESIDENTIAL_ADDRESS1" in df.columns:
+            df.insert(df.columns.get_loc("RESIDENTIAL_ADDRESS1") + 1, "StreetName",
+                      street_names(df["RESIDENTIAL_ADDRESS1"]))
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].dt.strftime("%Y-%m-%d")
+            elif isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+
+        with self.db:
+            df.to_sql("voters", self.db, if_exists="replace", index=False, chunksize=5000)
+            for col in INDEXED_COLUMNS:
+                if col in df.columns:
+                    self.db.execute(f"CREATE INDEX {_index_name(col)} ON voters ({_quote(col)})")
+            self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("loaded_at", datetime.now().isoformat(timespec="seconds")),
+                ("source", str(source)),
+                ("rows", str(len(df))),
+            ])
+        self.db.execute("ANALYZE")
+        print(f"Loaded {len(df)} voters into {self.path}")
+
+    def query(self, where="1", params=()):
+        """
+        Return the voters matching a SQL WHERE clause, in load order.
+        """
+        return pd.read_sql_query(f"SELECT * FROM voters WHERE {where} ORDER BY rowid", self.db, params=params)
+
+    def save_target(self, name, where, description=""):
+        # Run it once so a typo fails here rather than at export time.
+        self.db.execute(f"SELECT 1 FROM voters WHERE {where} LIMIT 1")
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO targets VALUES (?, ?, ?)", (name, where, description))
+
+    def targets(self):
+        return pd.read_sql_query("SELECT * FROM targets ORDER BY name", self.db)
+
+    def target(self, name):
+        """
+        Return the voters of a saved target.
+        """
+        row = self.db.execute("SELECT where_clause FROM targets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"No saved target named {name!r}")
+        return self.query(row[0])
+
+    def close(self):
+        self.db.close()
+
+
+def export_frame(df, filename):
+    """
+    Write df as xlsx (the ward workbook layout) or csv, by file extension.
+    """
+    if filename.lower().endswith(".xlsx"):
+        from voter_export import write_voter_workbook
+
+        write_voter_workbook(df, filename)
+    else:
+        df.to_csv(filename, index=False)
+        print(f"Data written to {filename} ({len(df)} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the scored voters through an indexed SQLite store.")
+    parser.add_argument("--db", help=f"store file (default: {os.path.join(CACHE_DIR, STORE_DB)})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load", help="load, filter and score a county file into the store")
+    load.add_argument("county_file")
+    load.add_argument("--ward", default="WARREN-WARD", help="keep rows whose WARD contains this (default: WARREN-WARD)")
+
+    save = commands.add_parser("save-target", help="save a named WHERE clause")
+    save.add_argument("name")
+    save.add_argument("where")
+    save.add_argument("-d", "--description", default="")
+
+    commands.add_parser("targets", help="list the saved targets")
+
+    query = commands.add_parser("query", help="run a saved target or a WHERE clause")
+    query.add_argument("name", nargs="?")
+    query.add_argument("--where")
+    query.add_argument("--output", help="xlsx or csv file to export to")
+    args = parser.parse_args()
+
+    store = VoterStore(args.db)
+    try:
+        if args.command == "load":
+            from voter_ingest import load_voter_file
+            from voter_scores import add_scores
+
+            df = load_voter_file(args.county_file)
+            df = df[df["WARD"].str.contains(args.ward, case=False, na=False)].sort_values(by="PRECINCT_NAME")
+            store.load(add_scores(df), source=args.county_file)
+        elif args.command == "save-target":
+            store.save_target(args.name, args.where, args.description)
+            print(f"Saved target {args.name!r}")
+        elif args.command == "targets":
+            print(store.targets().to_string(index=False))
+        else:
+            if not args.name and not args.where:
+                parser.error("query needs a saved target name or --where")
+            start = time.perf_counter()
+            df = store.target(args.name) if args.name else store.query(args.where)
+            print(f"{len(df)} voters in {(time.perf_counter() - start) * 1000:.1f} ms")
+            if args.output:
+                export_frame(df, args.output)
+    except (sqlite3.Error, KeyError) as e:
+        print(f"Query failed: {e}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,295 +1,207 @@
+import argparse
 import os
-import time
 from datetime import datetime
-import pandas as pd
 
-# --- Selenium and WebDriver Imports ---
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-
-# --- openpyxl for postprocessing the Excel file ---
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
+# --- County file download (HTTP session, Chrome fallback) ---
+from sos_download import TRUMBULL, fetch_county_file
+
+# --- vectorized voter scores and the single-pass Excel writer ---
+from voter_ingest import load_voter_file, read_filtered_voters
+from voter_scores import add_scores
+from voter_export import EXPORT_FORMATS, carry_forward, dateless_name, export_formats
+from voter_diff import (affected_wards, diff_snapshots, load_snapshot, rescore_changed, save_snapshot,
+                        snapshot_files, snapshot_meta)
+from households import build_households
+from geocode import GeocodeCache, add_coordinates, make_geocoder
+from voter_store import VoterStore
+from profiling import ProfiledWriter, StageProfiler
+from rollups import build_rollups, load_rollups, save_rollups, update_rollups, write_summary
+from snapshot_archive import ArchiveError, SnapshotArchive, read_text_snapshot
+
+parser = argparse.ArgumentParser(description="Download, score and export the City of Warren voter files.")
+parser.add_argument("--workers", type=int, default=1,
+                    help="number of processes used to write the city and ward files (default: 1)")
+parser.add_argument("--stream", action="store_true",
+                    help="filter the county file chunk by chunk instead of loading it whole")
+parser.add_argument("--format", nargs="+", choices=EXPORT_FORMATS, default=["xlsx"],
+                    help="file formats to write (default: xlsx)")
+parser.add_argument("--formulas", action="store_true",
+                    help="write the scores, DISPLAY and StreetName in the xlsx files as live Excel "
+                         "formulas (the scores as postprocess_excel writes them) instead of values")
+parser.add_argument("--incremental", action="store_true",
+                    help="diff against the previous run's snapshot, rescore only changed voters "
+                         "and regenerate only the affected ward files")
+parser.add_argument("--households", action="store_true",
+                    help="write one row per household (door) instead of one row per voter")
+parser.add_argument("--coordinates", nargs="?", const="", metavar="GEOCODER",
+                    help="add LATITUDE/LONGITUDE from the local geocode cache; addresses not cached yet are "
+                         "looked up with GEOCODER ('census' or an address-point CSV) when one is given")
+parser.add_argument("--store", action="store_true",
+                    help="also load the scored voters into the SQLite query store (see voter_store.py)")
+parser.add_argument("--rollups", action="store_true",
+                    help="write per-ward and per-precinct turnout and score summaries "
+                         "(CityOfWarren{date}-summary.xlsx, -turnout.csv, -scores.csv)")
+parser.add_argument("--archive", action="store_true",
+                    help="add the county download to the snapshot archive (see snapshot_archive.py)")
+parser.add_argument("--profile", action="store_true",
+                    help="record wall/CPU time, RSS change (resident memory after minus before) "
+                         "and rows per stage and per file to profile-{date}.json and .csv")
+parser.add_argument("--cprofile", metavar="DIR",
+                    help="run every file write under cProfile and leave a .prof and .txt per file in DIR")
+args = parser.parse_args()
+
+profiler = StageProfiler(enabled=args.profile)
 
 #########################################
-# STEP 1. Download the file via Selenium
+# STEP 1. Download the county file
 #########################################
 
 # Set up the download directory
 download_dir = os.path.join(os.getcwd(), "downloads")
-if not os.path.exists(download_dir):
-    os.makedirs(download_dir)
-
-chrome_options = Options()
-prefs = {
-    "download.default_directory": download_dir,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True
-}
-chrome_options.add_experimental_option("prefs", prefs)
-# Uncomment the next line to run headless if desired:
-# chrome_options.headless = True
-
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=chrome_options
-)
-
-# URL for TRUMBULL county file (which gives a 403 when using requests)
-download_url = "https://www6.ohiosos.gov/ords/f?p=VOTERFTP:DOWNLOAD::FILE:NO:2:P2_PRODUCT_NUMBER:78"
-driver.get(download_url)
-
-timeout = 60  # seconds
-start_time = time.time()
-downloaded_file_path = None
 
-while time.time() - start_time < timeout:
-    files = os.listdir(download_dir)
-    txt_files = [f for f in files if f.lower().endswith('.txt')]
-    if txt_files:
-        downloaded_file_path = os.path.join(download_dir, txt_files[0])
-        break
-    time.sleep(1)
-
-if not downloaded_file_path:
-    print("File download timed out. Exiting.")
-    driver.quit()
+# TRUMBULL county file over a pooled HTTP session (resumable, verified);
+# Chrome is only started if the HTTP download fails.
+try:
+    with profiler.stage("download"):
+        downloaded_file_path = fetch_county_file(TRUMBULL, download_dir)
+except Exception as e:
+    print(f"File download failed: {e}. Exiting.")
     exit()
 
 print(f"Downloaded file: {downloaded_file_path}")
-driver.quit()
 
 ######################################################
 # STEP 2. Process the downloaded file with pandas
 ######################################################
 try:
-    df = pd.read_csv(downloaded_file_path, delimiter=",")
+    if args.stream:
+        # Filter while reading: only rows whose WARD contains "WARREN-WARD" are kept.
+        with profiler.stage("load_filter") as stage:
+            filtered_df = read_filtered_voters(downloaded_file_path, "WARD", "WARREN-WARD")
+            stage["rows"] = len(filtered_df)
+    else:
+        # Typed load through the columnar cache; column names come back trimmed and upper-case.
+        with profiler.stage("load") as stage:
+            df = load_voter_file(downloaded_file_path)
+            stage["rows"] = len(df)
+        # Filter rows: use the WARD column to include only rows containing "WARREN-WARD"
+        with profiler.stage("filter") as stage:
+            filtered_df = df[df["WARD"].str.contains("WARREN-WARD", case=False, na=False)]
+            stage["rows"] = len(filtered_df)
 except Exception as e:
     print(f"Error reading the file with pandas: {e}")
     exit()
 
-# Normalize column names (trim and convert to uppercase)
-df.columns = df.columns.str.strip().str.upper()
-
-# Filter rows: use the WARD column to include only rows containing "WARREN-WARD"
-filtered_df = df[df["WARD"].str.contains("WARREN-WARD", case=False, na=False)]
-
 # Sort by PRECINCT_NAME
 try:
-    sorted_df = filtered_df.sort_values(by="PRECINCT_NAME")
+    with profiler.stage("sort", rows=len(filtered_df)):
+        sorted_df = filtered_df.sort_values(by="PRECINCT_NAME")
 except KeyError:
     print("The column 'PRECINCT_NAME' was not found. Check the file headers.")
     print("Available columns:", filtered_df.columns.tolist())
     exit()
 
-#############################################
-# Helper function: Post-process an Excel file
-#############################################
-def postprocess_excel(filename):
-    """
-    Open the Excel file, insert 6 new columns immediately to the right of the WARD column
-    with the following headers and formulas:
-      1. Total:  =COUNTA(vote_range)
-      2. Dems:   =COUNTIF(vote_range,"D")
-      3. REPS:   =COUNTIF(vote_range,"R")
-      4. Muni:   =SUM(IF(...)) for odd-year vote columns (if cell="D", count 1)
-      5. Latest: =SUM(IF(...)) for vote columns in the last 6 years (if cell<>"", count 1)
-      6. Both:   =IF(AND(Dems_cell>0, REPS_cell>0),1,0)
-    Then, insert a column after FIRST_NAME named DISPLAY that concatenates:
-         LAST_NAME + " " + LEFT(DATE_OF_BIRTH,4) + "T=" + Total + "D=" + Dems + "R=" + REPS + "M=" + Muni + "L=" + Latest + "B=" + Both
-    Also, insert a column after RESIDENTIAL_ADDRESS1 named StreetName that extracts the street name.
-    """
-    wb = load_workbook(filename)
-    ws = wb.active
-
-    # -------------------------------
-    # (A) Insert 6 columns after WARD
-    # -------------------------------
-    ward_col_idx = None
-    primary_col_idx = None  # first vote column (assumed to be labeled "PRIMARY-03/07/2000")
-    for col in range(1, ws.max_column + 1):
-        cell_val = ws.cell(row=1, column=col).value
-        if isinstance(cell_val, str):
-            val = cell_val.strip().upper()
-            if val == "WARD":
-                ward_col_idx = col
-            if val == "PRIMARY-03/07/2000":
-                primary_col_idx = col
-
-    if ward_col_idx is None:
-        print("Could not find 'WARD' column in the header of", filename)
-        return
-    if primary_col_idx is None:
-        print("Could not find 'PRIMARY-03/07/2000' column in the header of", filename)
-        return
-
-    # Insert 6 new columns immediately to the right of WARD.
-    insert_position = ward_col_idx + 1
-    ws.insert_cols(insert_position, amount=6)
-    # Adjust primary vote column index:
-    new_primary_idx = primary_col_idx + 6
-
-    # Identify the last vote column (assumed to be the last column in the worksheet).
-    last_vote_col_idx = ws.max_column
-
-    # Determine odd-year vote columns (for "Muni")
-    odd_year_cols = []
-    for col in range(new_primary_idx, last_vote_col_idx + 1):
-        header_val = ws.cell(row=1, column=col).value
-        if isinstance(header_val, str) and header_val.upper().startswith("PRIMARY-"):
-            try:
-                year = int(header_val.strip()[-4:])
-                if year % 2 == 1:
-                    odd_year_cols.append(col)
-            except:
-                pass
-    odd_year_letters = [get_column_letter(c) for c in odd_year_cols]
-
-    # Determine "Latest" vote columns (for votes in the last 6 years).
-    # Compute the threshold: any vote column with a header date with year >= (current_year - 6)
-    current_year = datetime.today().year
-    latest_threshold = current_year - 6  # e.g., if current_year=2025, include columns with year >= 2019
-    latest_cols = []
-    for col in range(new_primary_idx, last_vote_col_idx + 1):
-        header_val = ws.cell(row=1, column=col).value
-        if isinstance(header_val, str) and (("PRIMARY-" in header_val.upper()) or ("SPECIAL-" in header_val.upper())):
-            try:
-                year = int(header_val.strip()[-4:])
-                if year >= latest_threshold:
-                    latest_cols.append(col)
-            except:
-                pass
-    latest_letters = [get_column_letter(c) for c in latest_cols]
-
-    # Write the new header labels for the 6 inserted columns.
-    new_headers = ["Total:", "Dems", "REPS", "Muni", "Latest", "Both"]
-    for i, header in enumerate(new_headers):
-        ws.cell(row=1, column=insert_position + i, value=header)
-
-    # For each data row, add formulas in the 6 inserted columns.
-    first_vote_letter = get_column_letter(new_primary_idx)
-    last_vote_letter = get_column_letter(last_vote_col_idx)
-    for row in range(2, ws.max_row + 1):
-        vote_range = f"${first_vote_letter}${row}:${last_vote_letter}${row}"
-        # Total: count nonblank cells in the vote range.
-        total_formula = f"=COUNTA({vote_range})"
-        ws.cell(row=row, column=insert_position, value=total_formula)
-
-        # Dems: count cells equal to "D".
-        dems_formula = f'=COUNTIF({vote_range},"D")'
-        ws.cell(row=row, column=insert_position + 1, value=dems_formula)
-
-        # REPS: count cells equal to "R".
-        reps_formula = f'=COUNTIF({vote_range},"R")'
-        ws.cell(row=row, column=insert_position + 2, value=reps_formula)
-
-        # Muni: sum IF statements for odd-year vote columns.
-        muni_parts = []
-        for col_letter in odd_year_letters:
-            muni_parts.append(f'IF({col_letter}{row}="D",1,0)')
-        muni_formula = "=" + "+".join(muni_parts) if muni_parts else "=0"
-        ws.cell(row=row, column=insert_position + 3, value=muni_formula)
-
-        # Latest: sum IF statements for vote columns with header year >= latest_threshold.
-        latest_parts = []
-        for col_letter in latest_letters:
-            latest_parts.append(f'IF({col_letter}{row}<>"",1,0)')
-        latest_formula = "=" + "+".join(latest_parts) if latest_parts else "=0"
-        ws.cell(row=row, column=insert_position + 4, value=latest_formula)
-
-        # Both: if Dems > 0 AND REPS > 0 then 1, else 0.
-        dem_cell = get_column_letter(insert_position + 1) + str(row)
-        rep_cell = get_column_letter(insert_position + 2) + str(row)
-        both_formula = f"=IF(AND({dem_cell}>0, {rep_cell}>0),1,0)"
-        ws.cell(row=row, column=insert_position + 5, value=both_formula)
-
-    # -------------------------------
-    # (B) Insert a "DISPLAY" column after FIRST_NAME
-    # -------------------------------
-    first_name_idx = None
-    last_name_idx = None
-    dob_idx = None
-    # Also locate RESIDENTIAL_ADDRESS1 for later use.
-    res_address_idx = None
-    for col in range(1, ws.max_column + 1):
-        cell_val = ws.cell(row=1, column=col).value
-        if cell_val:
-            header = str(cell_val).strip().upper()
-            if header == "FIRST_NAME":
-                first_name_idx = col
-            elif header == "LAST_NAME":
-                last_name_idx = col
-            elif header == "DATE_OF_BIRTH":
-                dob_idx = col
-            elif header == "RESIDENTIAL_ADDRESS1":
-                res_address_idx = col
-
-    if first_name_idx is not None:
-        ws.insert_cols(first_name_idx + 1)
-        ws.cell(row=1, column=first_name_idx + 1, value="DISPLAY")
-        for row in range(2, ws.max_row + 1):
-            # Build cell references for LAST_NAME and DATE_OF_BIRTH.
-            last_name_cell = get_column_letter(last_name_idx) + str(row) if last_name_idx else ""
-            dob_cell = get_column_letter(dob_idx) + str(row) if dob_idx else ""
-            # The inserted vote columns (Total, Dems, REPS, Muni, Latest, Both) are located after WARD.
-            # Their positions relative to WARD: Total at (ward_col_idx+1), Dems at (ward_col_idx+2),
-            # REPS at (ward_col_idx+3), Muni at (ward_col_idx+4), Latest at (ward_col_idx+5), Both at (ward_col_idx+6).
-            total_cell = get_column_letter(ward_col_idx + 1) + str(row)
-            dems_cell = get_column_letter(ward_col_idx + 2) + str(row)
-            reps_cell = get_column_letter(ward_col_idx + 3) + str(row)
-            muni_cell = get_column_letter(ward_col_idx + 4) + str(row)
-            latest_cell = get_column_letter(ward_col_idx + 5) + str(row)
-            both_cell = get_column_letter(ward_col_idx + 6) + str(row)
-            display_formula = (
-                f'=CONCATENATE({last_name_cell}," ",LEFT({dob_cell},4),"T=",'
-                f'{total_cell},"D=",{dems_cell},"R=",{reps_cell},"M=",{muni_cell},"L=",{latest_cell},"B=",{both_cell})'
-            )
-            ws.cell(row=row, column=first_name_idx + 1, value=display_formula)
-
-    # -------------------------------
-    # (C) Insert a "StreetName" column after RESIDENTIAL_ADDRESS1
-    # -------------------------------
-    if res_address_idx is not None:
-        ws.insert_cols(res_address_idx + 1)
-        ws.cell(row=1, column=res_address_idx + 1, value="StreetName")
-        for row in range(2, ws.max_row + 1):
-            address_cell = get_column_letter(res_address_idx) + str(row)
-            street_formula = f'=RIGHT({address_cell},LEN({address_cell})-FIND(" ",{address_cell}))'
-            ws.cell(row=row, column=res_address_idx + 1, value=street_formula)
-            
-    wb.save(filename)
-    print(f"Post-processing complete. Final file saved as {filename}")
+today_str = datetime.today().strftime("%Y-%m-%d")
+only_wards = None
+delta = None
+
+previous_df, previous_year = load_snapshot("CityOfWarren") if args.incremental else (None, None)
+previous_id = snapshot_meta("CityOfWarren").get("id") if previous_df is not None else None
+if previous_df is None:
+    # Score every voter as plain integer columns placed right after WARD.
+    with profiler.stage("score", rows=len(sorted_df)):
+        sorted_df = add_scores(sorted_df)
+else:
+    # Compare with the previous snapshot; only changed voters are rescored and only
+    # the wards they were in (or moved to) are written again.
+    with profiler.stage("diff") as stage:
+        delta = diff_snapshots(previous_df, sorted_df)
+        stage["rows"] = len(delta)
+    with profiler.stage("rescore") as stage:
+        sorted_df, rescored = rescore_changed(sorted_df, previous_df, delta, previous_year=previous_year)
+        stage["rows"] = rescored
+    delta_filename = f"CityOfWarren{today_str}-delta.csv"
+    delta.to_csv(delta_filename, index=False)
+    only_wards = affected_wards(delta)
+    print(f"Delta written to {delta_filename}: {delta['CHANGE'].value_counts().to_dict()}")
+    print(f"Rescored {rescored} of {len(sorted_df)} voters; wards to regenerate: {only_wards}")
+
+if args.rollups:
+    # Ballot counts are additive: with a delta only the changed voters are recounted.
+    with profiler.stage("rollups") as stage:
+        # Saved counts are only reused when they were counted from the snapshot this delta is against.
+        rollups = load_rollups("CityOfWarren", snapshot=previous_id) if delta is not None else None
+        if rollups is None:
+            rollups = build_rollups(sorted_df)
+        else:
+            rollups = update_rollups(rollups, previous_df, sorted_df, delta)
+        write_summary(sorted_df, rollups, f"CityOfWarren{today_str}")
+        stage["rows"] = sum(len(counts) for counts in rollups.values())
 
 #############################################
-# STEP 3. Write the Overall DataFrame to Excel
+# STEP 3/4. Write the overall file and one file per WARD
 #############################################
-today_str = datetime.today().strftime("%Y-%m-%d")
 overall_filename = f"CityOfWarren{today_str}.xlsx"
-
-try:
-    sorted_df.to_excel(overall_filename, index=False, engine='openpyxl')
-    print(f"Overall data written to {overall_filename}")
-except Exception as e:
-    print(f"Error saving the overall Excel file: {e}")
-    exit()
-
-postprocess_excel(overall_filename)
-
-#######################################################
-# STEP 4. Create separate files for each unique WARD
-#######################################################
-unique_wards = sorted_df["WARD"].unique()
-
-for ward in unique_wards:
-    ward_df = sorted_df[sorted_df["WARD"] == ward]
-    ward_filename = f"City_of_{ward}-{today_str}.xlsx"
-    try:
-        ward_df.to_excel(ward_filename, index=False, engine='openpyxl')
-        print(f"Data for ward '{ward}' written to {ward_filename}")
-    except Exception as e:
-        print(f"Error saving Excel file for ward '{ward}': {e}")
-        continue
-    postprocess_excel(ward_filename)
+ward_filename = f"City_of_{{ward}}-{today_str}.xlsx"
+export_df = sorted_df
+if args.households:
+    # One row per door with summed scores and a member list; about half the rows.
+    with profiler.stage("households") as stage:
+        export_df = build_households(sorted_df)
+        stage["rows"] = len(export_df)
+    overall_filename = f"CityOfWarren{today_str}-households.xlsx"
+    ward_filename = f"City_of_{{ward}}-{today_str}-households.xlsx"
+    print(f"{len(sorted_df)} voters in {len(export_df)} households")
+if args.coordinates is not None:
+    with profiler.stage("coordinates", rows=len(export_df)):
+        geocode_cache = GeocodeCache()
+        export_df = add_coordinates(export_df, geocode_cache, make_geocoder(args.coordinates))
+        geocode_cache.close()
+
+# Earlier files are only reused when they were written with the same output options.
+output_options = {"format": args.format, "formulas": args.formulas, "households": args.households,
+                  "coordinates": args.coordinates}
+output_files = snapshot_files("CityOfWarren") if args.incremental else {}
+if only_wards is not None and snapshot_meta("CityOfWarren").get("options") != output_options:
+    print("Output options differ from the previous snapshot's; writing every ward file.")
+    only_wards = None
+    output_files = {}
+if only_wards is not None:
+    # Unchanged wards get today's file name by copying the last run's file; a ward with no
+    # earlier file is written like a changed one. The citywide file is always written.
+    unchanged = [ward for ward in export_df["WARD"].dropna().unique() if ward not in only_wards]
+    carried, missing = carry_forward(output_files, ward_filename, unchanged, args.format, today_str)
+    output_files.update(carried)
+    only_wards = sorted(set(only_wards) | set(missing))
+    if not only_wards:
+        print("No voters changed since the previous snapshot; writing the citywide file only.")
+
+wrap = (lambda writer: ProfiledWriter(writer, args.cprofile)) if args.cprofile else None
+with profiler.stage("export", rows=len(export_df)):
+    timings = export_formats(export_df, overall_filename, ward_filename, args.format, formulas=args.formulas,
+                             wrap=wrap, workers=args.workers, only_wards=only_wards)
+profiler.add_files(timings)
+output_files.update({dateless_name(filename, today_str): filename for _, filename, *_ in timings})
+
+if args.incremental:
+    with profiler.stage("save_snapshot", rows=len(sorted_df)):
+        snapshot_id = save_snapshot(sorted_df, "CityOfWarren", files=output_files, options=output_options)
+        # Rollups are tagged with the snapshot they were counted from; a run without
+        # --rollups leaves them behind that snapshot, so the next --rollups run rebuilds them.
+        if args.rollups:
+            save_rollups(rollups, "CityOfWarren", snapshot=snapshot_id)
+
+if args.store:
+    with profiler.stage("store", rows=len(sorted_df)):
+        store = VoterStore()
+        store.load(sorted_df, source=downloaded_file_path)
+        store.close()
+
+if args.archive:
+    with profiler.stage("archive"):
+        try:
+            SnapshotArchive().add(read_text_snapshot(downloaded_file_path), today_str)
+        except ArchiveError as e:
+            print(f"Not archived: {e}")
+
+profiler.write(f"profile-{today_str}")
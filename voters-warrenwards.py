@@ -1,89 +1,84 @@
+import argparse
 import os
-import time
 from datetime import datetime
-import pandas as pd
 
-# --- Selenium and WebDriver Imports ---
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+# --- County file download (HTTP session, Chrome fallback) ---
+from sos_download import TRUMBULL, fetch_county_file
 
 # --- openpyxl for postprocessing the Excel file ---
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 
+# --- typed/cached ingest and per-ward export, optionally across a process pool ---
+from voter_export import EXPORT_FORMATS, export_formats, export_wards, vote_formulas
+from voter_ingest import load_voter_file, read_filtered_voters
+from voter_schema import header_schema
+from profiling import ProfiledWriter, StageProfiler
+
+parser = argparse.ArgumentParser(description="Download and export the City of Warren voter files by ward.")
+parser.add_argument("--workers", type=int, default=1,
+                    help="number of processes used to write the city and ward files (default: 1)")
+parser.add_argument("--stream", action="store_true",
+                    help="filter the county file chunk by chunk instead of loading it whole")
+parser.add_argument("--format", nargs="+", choices=EXPORT_FORMATS, default=["xlsx"],
+                    help="file formats to write (default: xlsx); scores, DISPLAY and StreetName are literal values")
+parser.add_argument("--formulas", action="store_true",
+                    help="write the xlsx files with live Total:/Dems/REPS/Muni formulas (postprocess_excel) "
+                         "instead of computed values")
+parser.add_argument("--profile", action="store_true",
+                    help="record wall/CPU time, RSS change (resident memory after minus before) "
+                         "and rows per stage and per file to profile-wards-{date}.json and .csv")
+parser.add_argument("--cprofile", metavar="DIR",
+                    help="run every write_ward_file call under cProfile (load_workbook, insert_cols, "
+                         "formula building, wb.save) and leave a .prof and .txt per file in DIR")
+args = parser.parse_args()
+
+profiler = StageProfiler(enabled=args.profile)
+
 #########################################
-# STEP 1. Download the file via Selenium
+# STEP 1. Download the county file
 #########################################
 
 # Set up the download directory
 download_dir = os.path.join(os.getcwd(), "downloads")
-if not os.path.exists(download_dir):
-    os.makedirs(download_dir)
-
-# Configure Chrome options to automatically download files.
-chrome_options = Options()
-prefs = {
-    "download.default_directory": download_dir,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True
-}
-chrome_options.add_experimental_option("prefs", prefs)
-# Uncomment next line to run in headless mode if needed:
-# chrome_options.headless = True
-
-# Initialize the Selenium Chrome WebDriver.
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=chrome_options
-)
-
-# URL for TRUMBULL county file (which gives a 403 using requests)
-download_url = "https://www6.ohiosos.gov/ords/f?p=VOTERFTP:DOWNLOAD::FILE:NO:2:P2_PRODUCT_NUMBER:78"
-driver.get(download_url)
-
-# Wait for the file download (poll the download_dir for a .txt file)
-timeout = 60  # seconds
-start_time = time.time()
-downloaded_file_path = None
-
-while time.time() - start_time < timeout:
-    files = os.listdir(download_dir)
-    txt_files = [f for f in files if f.lower().endswith('.txt')]
-    if txt_files:
-        downloaded_file_path = os.path.join(download_dir, txt_files[0])
-        break
-    time.sleep(1)
-
-if not downloaded_file_path:
-    print("File download timed out. Exiting.")
-    driver.quit()
+
+# TRUMBULL county file over a pooled HTTP session (resumable, verified);
+# Chrome is only started if the HTTP download fails.
+try:
+    with profiler.stage("download"):
+        downloaded_file_path = fetch_county_file(TRUMBULL, download_dir)
+except Exception as e:
+    print(f"File download failed: {e}. Exiting.")
     exit()
 
 print(f"Downloaded file: {downloaded_file_path}")
-driver.quit()
 
 ######################################################
 # STEP 2. Process the downloaded file with pandas
 ######################################################
 try:
-    # Adjust delimiter if necessary (here we assume CSV format)
-    df = pd.read_csv(downloaded_file_path, delimiter=",")
+    if args.stream:
+        # Filter while reading: only rows whose WARD contains "WARREN-WARD" are kept.
+        with profiler.stage("load_filter") as stage:
+            filtered_df = read_filtered_voters(downloaded_file_path, "WARD", "WARREN-WARD")
+            stage["rows"] = len(filtered_df)
+    else:
+        # Typed load through the columnar cache; column names come back trimmed and upper-case.
+        with profiler.stage("load") as stage:
+            df = load_voter_file(downloaded_file_path)
+            stage["rows"] = len(df)
+        # Filter rows: use the WARD column to include only rows containing "WARREN-WARD"
+        with profiler.stage("filter") as stage:
+            filtered_df = df[df["WARD"].str.contains("WARREN-WARD", case=False, na=False)]
+            stage["rows"] = len(filtered_df)
 except Exception as e:
     print(f"Error reading the file with pandas: {e}")
     exit()
 
-# Normalize column names: remove extra whitespace and convert to uppercase.
-df.columns = df.columns.str.strip().str.upper()
-
-# Instead of filtering by CITY, filter rows where the "WARD" column contains "WARREN-WARD"
-filtered_df = df[df["WARD"].str.contains("WARREN-WARD", case=False, na=False)]
-
 # Sort the data by "PRECINCT_NAME"
 try:
-    sorted_df = filtered_df.sort_values(by="PRECINCT_NAME")
+    with profiler.stage("sort", rows=len(filtered_df)):
+        sorted_df = filtered_df.sort_values(by="PRECINCT_NAME")
 except KeyError:
     print("The column 'PRECINCT_NAME' was not found. Check the file headers.")
     print("Available columns:", filtered_df.columns.tolist())
@@ -100,52 +95,33 @@ def postprocess_excel(filename):
       - Dems: counts cells equal to "D"
       - REPS: counts cells equal to "R"
       - Muni: sums IF statements for odd-year vote columns that equal "D"
-    The vote columns are assumed to start at header "PRIMARY-03/07/2000".
+    Column positions come from the header schema (parsed once per distinct header), so the
+    vote columns are found whatever the first election in the file is.
     """
     wb = load_workbook(filename)
     ws = wb.active
 
-    # Identify key columns based on header row (row 1)
-    ward_col_idx = None
-    primary_col_idx = None
-
-    for col in range(1, ws.max_column + 1):
-        cell_val = ws.cell(row=1, column=col).value
-        if isinstance(cell_val, str):
-            cell_val = cell_val.strip().upper()
-            if cell_val == "WARD":
-                ward_col_idx = col
-            if cell_val == "PRIMARY-03/07/2000":
-                primary_col_idx = col
-
-    if ward_col_idx is None:
+    # Identify key columns from the header row (row 1), read once.
+    schema = header_schema(cell.value for cell in ws[1])
+    ward_position = schema.position("WARD")
+    if ward_position is None:
         print("Could not find 'WARD' column in the header of", filename)
         return
-    if primary_col_idx is None:
-        print("Could not find 'PRIMARY-03/07/2000' column in the header of", filename)
+    if not schema.elections:
+        print("Could not find any PRIMARY-/GENERAL-/SPECIAL- vote columns in the header of", filename)
         return
 
     # Insert four new columns immediately to the right of the WARD column.
-    insert_position = ward_col_idx + 1
+    insert_position = ward_position + 2
     ws.insert_cols(insert_position, amount=4)
 
-    # Because of the insertion, vote columns shift right.
-    new_primary_idx = primary_col_idx + 4
-
-    # Identify the last vote column (assumed to be the last column in the worksheet).
-    last_vote_col_idx = ws.max_column
+    # Because of the insertion, columns after WARD shift right by four (1-based below).
+    def shifted(position):
+        return position + 1 + (4 if position + 1 >= insert_position else 0)
 
-    # Determine which vote columns (from new_primary_idx to last_vote_col_idx) have an odd year.
-    odd_year_cols = []
-    for col in range(new_primary_idx, last_vote_col_idx + 1):
-        header_val = ws.cell(row=1, column=col).value
-        if isinstance(header_val, str) and header_val.upper().startswith("PRIMARY-"):
-            try:
-                year = int(header_val.strip()[-4:])
-                if year % 2 == 1:
-                    odd_year_cols.append(col)
-            except:
-                pass
+    new_primary_idx = shifted(schema.elections[0].position)
+    last_vote_col_idx = shifted(schema.elections[-1].position)
+    odd_year_cols = [shifted(e.position) for e in schema.select(types=["PRIMARY"], odd_year=True)]
 
     # Get Excel column letters for the vote range.
     first_vote_letter = get_column_letter(new_primary_idx)
@@ -157,60 +133,41 @@ def postprocess_excel(filename):
     for i, header in enumerate(new_headers):
         ws.cell(row=1, column=insert_position + i, value=header)
 
-    # For each data row, insert formulas in the new columns.
+    # For each data row, insert formulas in the new columns (see vote_formulas):
+    # Total: nonblank cells in the vote range, Dems/REPS: cells equal to "D"/"R",
+    # Muni: IF(cell="D",1,0) summed over the odd-year vote columns.
     for row in range(2, ws.max_row + 1):
-        vote_range = f"${first_vote_letter}${row}:${last_vote_letter}${row}"
-        # Total: count nonblank cells in the vote range.
-        total_formula = f"=COUNTA({vote_range})"
-        ws.cell(row=row, column=insert_position, value=total_formula)
-        # Dems: count cells equal to "D".
-        dems_formula = f'=COUNTIF({vote_range},"D")'
-        ws.cell(row=row, column=insert_position + 1, value=dems_formula)
-        # REPS: count cells equal to "R".
-        reps_formula = f'=COUNTIF({vote_range},"R")'
-        ws.cell(row=row, column=insert_position + 2, value=reps_formula)
-        # Muni: sum IF statements for odd-year vote columns (if cell equals "D", add 1).
-        muni_parts = []
-        for col_letter in odd_year_letters:
-            muni_parts.append(f'IF({col_letter}{row}="D",1,0)')
-        muni_formula = "=" + "+".join(muni_parts) if muni_parts else "=0"
-        ws.cell(row=row, column=insert_position + 3, value=muni_formula)
+        for i, formula in enumerate(vote_formulas(row, first_vote_letter, last_vote_letter, odd_year_letters)):
+            ws.cell(row=row, column=insert_position + i, value=formula)
 
     wb.save(filename)
     print(f"Post-processing complete. Final file saved as {filename}")
 
+def write_ward_file(df, filename):
+    """
+    Write df to filename and post-process it (insert columns and formulas).
+    """
+    df.to_excel(filename, index=False, engine='openpyxl')
+    print(f"Data written to {filename}")
+    postprocess_excel(filename)
+
 #############################################
-# STEP 3. Write the Overall DataFrame to Excel
+# STEP 3/4. Write the overall file and one file per WARD
 #############################################
 today_str = datetime.today().strftime("%Y-%m-%d")
 overall_filename = f"CityOfWarren{today_str}.xlsx"
-
-try:
-    # Write the overall sorted DataFrame to Excel.
-    sorted_df.to_excel(overall_filename, index=False, engine='openpyxl')
-    print(f"Overall data written to {overall_filename}")
-except Exception as e:
-    print(f"Error saving the overall Excel file: {e}")
-    exit()
-
-# Post-process the overall file.
-postprocess_excel(overall_filename)
-
-#######################################################
-# STEP 4. Create separate files for each unique WARD
-#######################################################
-unique_wards = sorted_df["WARD"].unique()
-
-for ward in unique_wards:
-    ward_df = sorted_df[sorted_df["WARD"] == ward]
-    # Build a filename. (Ensure ward name is safe for filenames if necessary.)
-    ward_filename = f"City of {ward}-{today_str}.xlsx"
-    try:
-        ward_df.to_excel(ward_filename, index=False, engine='openpyxl')
-        print(f"Data for ward '{ward}' written to {ward_filename}")
-    except Exception as e:
-        print(f"Error saving Excel file for ward '{ward}': {e}")
-        continue
-
-    # Post-process the ward file (insert columns and formulas).
-    postprocess_excel(ward_filename)
+# Build a filename per ward. (Ensure ward name is safe for filenames if necessary.)
+ward_filename = f"City of {{ward}}-{today_str}.xlsx"
+
+wrap = (lambda writer: ProfiledWriter(writer, args.cprofile)) if args.cprofile else None
+formats = args.format
+timings = []
+with profiler.stage("export", rows=len(sorted_df)):
+    if args.formulas and "xlsx" in formats:
+        # The original workbooks: raw columns plus live formulas inserted after WARD.
+        formats = [fmt for fmt in formats if fmt != "xlsx"]
+        timings += export_wards(sorted_df, overall_filename, ward_filename, workers=args.workers,
+                                writer=wrap(write_ward_file) if wrap else write_ward_file)
+    timings += export_formats(sorted_df, overall_filename, ward_filename, formats, workers=args.workers, wrap=wrap)
+profiler.add_files(timings)
+profiler.write(f"profile-wards-{today_str}")
@@ -1,8 +1,9 @@
-import pandas as pd
 import requests
 from io import StringIO
 from datetime import datetime
 
+from voter_ingest import read_filtered_voters
+
 # URL of the data file from the Ohio Secretary of State website
 url = "https://www6.ohiosos.gov/ords/f?p=VOTERFTP:DOWNLOAD::FILE:NO:2:P2_PRODUCT_NUMBER:78"
 headers = {
@@ -25,11 +26,10 @@ response.raise_for_status()  # Raise an error if the download failed
 # For example, if the file is comma-separated, use delimiter=','.
 # If it is tab-separated, use delimiter='\t'.
 data = StringIO(response.text)
-df = pd.read_csv(data, delimiter=",")  # Adjust delimiter if needed
 
-# Filter rows where the CITY column contains "WARREN CITY"
-# If you need an exact match, use == instead of str.contains.
-filtered_df = df[df["CITY"].str.contains("WARREN CITY", na=False)]
+# Filter rows where the CITY column contains "WARREN CITY" chunk by chunk while parsing,
+# so only the city's rows are ever held as a DataFrame.
+filtered_df = read_filtered_voters(data, "CITY", "WARREN CITY")
 
 # Sort the filtered DataFrame by the PRECINCT column.
 # If PRECINCT is numeric but stored as a string, you might need to convert it.
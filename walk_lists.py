@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Build canvass walk lists: doors grouped by precinct and street, walked up the odd side
+and back down the even side, cut into turfs of about --doors doors per volunteer.
+
+    python walk_lists.py CityOfWarren2025-02-06-target-googlemaps.csv --doors 60
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from addresses import parse_addresses
+from households import build_households
+from voter_export import export_wards
+from voter_schema import election_table
+from voter_scores import SCORE_COLUMNS, add_scores
+
+# Doors one volunteer can knock in a shift.
+TURF_DOORS = 60
+
+# Leading columns of a walk list; the rest of the household row follows.
+WALK_COLUMNS = ["TURF", "STOP", "PRECINCT_NAME", "StreetName", "SIDE", "HOUSE_NUMBER"]
+
+
+def parse_house_numbers(addresses):
+    """
+    Split RESIDENTIAL_ADDRESS1 values (see addresses.parse_address) into HOUSE_NUMBER (float,
+    NaN when there is none), HOUSE_SUFFIX ("A", "1/2" or "") and StreetName
+    ("S LEAVITT RD"; a PO box keeps all its words).
+    """
+    parsed = parse_addresses(addresses)
+    return pd.DataFrame({
+        "HOUSE_NUMBER": pd.to_numeric(parsed["HOUSE_NUMBER"], errors="coerce"),
+        "HOUSE_SUFFIX": parsed["HOUSE_SUFFIX"],
+        "StreetName": parsed["StreetName"],
+    })
+
+
+def walk_order(doors):
+    """
+    Return doors (one row per household) sorted into walking order: by PRECINCT_NAME and
+    street, then up the odd side by house number and back down the even side. Adds
+    StreetName, SIDE ("ODD"/"EVEN"/"") and HOUSE_NUMBER from RESIDENTIAL_ADDRESS1.
+    """
+    doors = doors.drop(columns=["StreetName", "HOUSE_NUMBER", "HOUSE_SUFFIX", "SIDE"], errors="ignore")
+    parsed = parse_house_numbers(doors["RESIDENTIAL_ADDRESS1"])
+    doors = pd.concat([doors, parsed], axis=1)
+    number = doors["HOUSE_NUMBER"].to_numpy()
+    odd = number % 2 == 1
+    doors["SIDE"] = np.where(np.isnan(number), "", np.where(odd, "ODD", "EVEN"))
+    # Odd side ascending, then the even side descending; doors without a number go last.
+    walk_key = np.where(odd, number, -number)
+    side_key = np.where(np.isnan(number), 2, np.where(odd, 0, 1))
+    secondary = doors["RESIDENTIAL_SECONDARY_ADDR"].astype(object).fillna("").astype(str) \
+        if "RESIDENTIAL_SECONDARY_ADDR" in doors.columns else pd.Series("", index=doors.index)
+    precinct = doors["PRECINCT_NAME"].astype(object).fillna("").astype(str)
+    order = np.lexsort((secondary.to_numpy(), doors["HOUSE_SUFFIX"].to_numpy(), walk_key, side_key,
+                        doors["StreetName"].to_numpy(), precinct.to_numpy()))
+    return doors.iloc[order].reset_index(drop=True)
+
+
+def assign_turfs(walk, target_doors=TURF_DOORS):
+    """
+    Cut a walk_order frame into turfs of about target_doors doors. Turfs never cross a
+    precinct; a street side is only split when it alone is longer than target_doors.
+    Adds TURF ("{PRECINCT_NAME} T01") and STOP (1, 2, ... within the turf) as the first columns.
+    """
+    precinct = walk["PRECINCT_NAME"].astype(object).fillna("").astype(str).to_numpy()
+    # Runs of consecutive doors on the same precinct, street and side are the units turfs are built from.
+    block_start = np.ones(len(walk), dtype=bool)
+    block_start[1:] = ((precinct[1:] != precinct[:-1])
+                       | (walk["StreetName"].to_numpy()[1:] != walk["StreetName"].to_numpy()[:-1])
+                       | (walk["SIDE"].to_numpy()[1:] != walk["SIDE"].to_numpy()[:-1]))
+    starts = np.flatnonzero(block_start)
+    sizes = np.diff(np.append(starts, len(walk)))
+
+    turf_numbers = np.empty(len(walk), dtype=np.int64)
+    turf, doors_in_turf, previous_precinct = 0, 0, None
+    for start, size in zip(starts, sizes):
+        if precinct[start] != previous_precinct:
+            turf, doors_in_turf, previous_precinct = 1, 0, precinct[start]
+        for offset in range(0, size, target_doors):
+            piece = min(target_doors, size - offset)
+            if doors_in_turf and doors_in_turf + piece > target_doors:
+                turf, doors_in_turf = turf + 1, 0
+            turf_numbers[start + offset:start + offset + piece] = turf
+            doors_in_turf += piece
+
+    walk = walk.copy()
+    walk.insert(0, "TURF", [f"{p} T{t:02d}" for p, t in zip(precinct, turf_numbers)])
+    walk.insert(1, "STOP", walk.groupby("TURF", sort=False).cumcount() + 1)
+    return walk
+
+
+def build_walk_lists(df, target_doors=TURF_DOORS):
+    """
+    From a voter frame (or a household frame with HOUSEHOLD_ID) return one row per door in
+    walking order, with TURF, STOP, PRECINCT_NAME, StreetName, SIDE and HOUSE_NUMBER first.
+    """
+    doors = df if "HOUSEHOLD_ID" in df.columns else build_households(df)
+    walk = assign_turfs(walk_order(doors), target_doors)
+    leading = [col for col in WALK_COLUMNS if col in walk.columns]
+    rest = [col for col in walk.columns if col not in leading and col != "HOUSE_SUFFIX"]
+    walk["HOUSE_NUMBER"] = walk["HOUSE_NUMBER"].astype("Int64")
+    return walk[leading + rest]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write per-ward canvass walk lists split into volunteer turfs.")
+    parser.add_argument("input_file", help="voter or household CSV with RESIDENTIAL_ADDRESS1, PRECINCT_NAME and WARD")
+    parser.add_argument("--doors", type=int, default=TURF_DOORS,
+                        help=f"target doors per turf (default: {TURF_DOORS})")
+    parser.add_argument("--output-dir", default=".", help="directory for the walk list files")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to write the files")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input_file, dtype={"SOS_VOTERID": str, "RESIDENTIAL_ZIP": str}, low_memory=False)
+    if not all(col in df.columns for col in SCORE_COLUMNS) and len(election_table(df.columns)):
+        df = add_scores(df)
+    walk = build_walk_lists(df, args.doors)
+    print(f"{len(walk)} doors in {walk['TURF'].nunique()} turfs of about {args.doors} doors")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(args.input_file))[0]
+    export_wards(walk, os.path.join(args.output_dir, f"{base}-walk.xlsx"),
+                 os.path.join(args.output_dir, f"City_of_{{ward}}-{base}-walk.xlsx"), workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
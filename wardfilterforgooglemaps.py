@@ -1,42 +1,114 @@
 #!/usr/bin/env python3
-import pandas as pd
-import math
+import argparse
+import csv
+import os
+from collections import OrderedDict
+
+# Google My Maps imports at most 2000 rows per layer.
+MAPS_IMPORT_LIMIT = 2000
+# Group files kept open at once; older ones are closed and reopened for append when needed.
+MAX_OPEN_FILES = 64
+
+
+class GroupFile:
+    """
+    The currently open output file of one group. Rows go to a .part file that is renamed to
+    {prefix}-{group}-Rows{start}-{end}.csv when it is full or the input ends.
+    """
+
+    def __init__(self, prefix, group):
+        self.prefix = prefix
+        self.group = str(group).replace(os.sep, "_")
+        self.rows = 0          # rows written for this group so far
+        self.start = 1         # first row number of the current file
+        self.handle = None
+        self.writer = None
+        self.fresh = True      # the current file has not been created yet
+
+    @property
+    def part_path(self):
+        return f"{self.prefix}-{self.group}-Rows{self.start}.part"
+
+    def open(self, header):
+        self.handle = open(self.part_path, "w" if self.fresh else "a", newline="")
+        self.writer = csv.writer(self.handle, lineterminator="\n")
+        if self.fresh:
+            self.writer.writerow(header)
+            self.fresh = False
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = self.writer = None
+
+    def finish(self):
+        """
+        Close the current file and give it its final Rows{start}-{end} name.
+        """
+        self.close()
+        output_file = f"{self.prefix}-{self.group}-Rows{self.start}-{self.rows}.csv"
+        os.replace(self.part_path, output_file)
+        print(f"Saved {output_file}")
+        self.start = self.rows + 1
+        self.fresh = True
+
+
+def split_csv(input_file, chunk_size=MAPS_IMPORT_LIMIT, group_by="WARD", output_dir="."):
+    """
+    Read input_file once and write each row straight to its group's current output file,
+    starting a new file every chunk_size rows. Memory stays constant however large the input:
+    only one row and at most MAX_OPEN_FILES file handles are held at a time.
+    """
+    base = os.path.splitext(os.path.basename(input_file))[0]
+    prefix = os.path.join(output_dir, base)
+    groups = {}
+    open_files = OrderedDict()
+
+    with open(input_file, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        try:
+            group_idx = header.index(group_by)
+        except ValueError:
+            raise KeyError(f"Column {group_by!r} not found in {input_file}") from None
+
+        for row in reader:
+            key = row[group_idx]
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = GroupFile(prefix, key)
+            if group.handle is None:
+                if len(open_files) >= MAX_OPEN_FILES:
+                    open_files.popitem(last=False)[1].close()
+                group.open(header)
+            open_files[key] = group
+            open_files.move_to_end(key)
+
+            group.writer.writerow(row)
+            group.rows += 1
+            if group.rows - group.start + 1 == chunk_size:
+                group.finish()
+                open_files.pop(key)
+
+    for group in groups.values():
+        if group.rows >= group.start:
+            group.finish()
+
 
 def main():
-    # Input CSV file
-    input_file = "CityOfWarren2025-02-06-target-googlemaps.csv"
-    chunk_size = 2000
-
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(input_file)
-
-    # Group the DataFrame by the "WARD" column
-    for ward, ward_df in df.groupby('WARD'):
-        # Reset index so that slicing is straightforward
-        ward_df = ward_df.reset_index(drop=True)
-        total_rows = len(ward_df)
-        # Calculate the number of files needed for this ward
-        num_files = math.ceil(total_rows / chunk_size)
-        
-        for i in range(num_files):
-            start_index = i * chunk_size
-            end_index = (i + 1) * chunk_size
-            # Slice the DataFrame for the current chunk
-            sub_df = ward_df.iloc[start_index:end_index]
-            
-            # Calculate row numbers for naming (1-indexed)
-            row_start = start_index + 1
-            row_end = min(end_index, total_rows)
-            
-            # Construct the output file name
-            output_file = (
-                f"CityOfWarren2025-02-06-target-googlemaps-{ward}"
-                f"-Rows{row_start}-{row_end}.csv"
-            )
-            
-            # Save the chunk to a new CSV file without the index
-            sub_df.to_csv(output_file, index=False)
-            print(f"Saved {output_file}")
+    parser = argparse.ArgumentParser(
+        description="Split a Google Maps target CSV into per-group files of at most --chunk-size rows, "
+                    "named {input}-{GROUP}-Rows{start}-{end}.csv.")
+    parser.add_argument("input_file", nargs="?", default="CityOfWarren2025-02-06-target-googlemaps.csv")
+    parser.add_argument("--chunk-size", type=int, default=MAPS_IMPORT_LIMIT,
+                        help=f"maximum rows per output file (default: {MAPS_IMPORT_LIMIT})")
+    parser.add_argument("--group-by", default="WARD",
+                        help="column to split on, e.g. WARD, PRECINCT_NAME or StreetName (default: WARD)")
+    parser.add_argument("--output-dir", default=".", help="directory for the output files")
+    args = parser.parse_args()
+
+    split_csv(args.input_file, args.chunk_size, args.group_by, args.output_dir)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+One command line for the whole pipeline. Each subcommand imports only what it needs, so the
+offline ones start quickly and never load selenium; and each reuses the previous stage's
+cached output when it is newer than that stage's input.
+
+    python wardvoters.py download              # county file -> downloads/county-78.txt
+    python wardvoters.py ingest                # -> cache/stage-filtered.pkl (Warren wards, sorted)
+    python wardvoters.py score                 # -> cache/stage-scored.pkl
+    python wardvoters.py export --workers 4    # -> CityOfWarren{date}.xlsx + one file per ward
+    python wardvoters.py rollup                # -> CityOfWarren{date}-summary.xlsx, -turnout.csv, -scores.csv
+    python wardvoters.py search toles 1959     # fuzzy lookup across the county file
+    python wardvoters.py serve --port 8080     # HTTP lookups for canvassers (see lookup_server.py)
+    python wardvoters.py archive               # add today's county file to archive/ (see snapshot_archive.py)
+    python wardvoters.py split-maps CityOfWarren2025-02-06-target-googlemaps.csv
+
+Every stage runs the stages before it when their output is missing or stale; --force
+reruns them all.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from wardfilterforgooglemaps import MAPS_IMPORT_LIMIT, split_csv
+
+TRUMBULL = 78  # kept in step with sos_download.TRUMBULL, which would pull in requests
+CITY_WARD = "WARREN-WARD"
+EXPORT_FORMATS = ["xlsx", "csv", "parquet"]  # kept in step with voter_export.EXPORT_FORMATS
+
+
+def _cache_dir():
+    return os.path.join(os.getcwd(), "cache")
+
+
+def _stage_path(name):
+    return os.path.join(_cache_dir(), f"stage-{name}.pkl")
+
+
+def _is_fresh(output, source, meta=None):
+    """
+    True when output exists, is at least as new as source, and was made with the same
+    parameters (meta, as saved next to it by _save_stage).
+    """
+    if not (os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(source)):
+        return False
+    try:
+        with open(output + ".json") as f:
+            return json.load(f) == meta
+    except (OSError, ValueError):
+        return meta is None
+
+
+def _save_stage(df, name, meta=None):
+    os.makedirs(_cache_dir(), exist_ok=True)
+    path = _stage_path(name)
+    df.to_pickle(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    with open(path + ".json.tmp", "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(path + ".json.tmp", path + ".json")
+    return path
+
+
+def _stage_meta(args, source):
+    """
+    What the filtered and scored stages depend on besides the age of their input: the
+    county file itself and the options that change which rows are kept.
+    """
+    stat = os.stat(source)
+    return {"source": os.path.abspath(source), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "product": args.product, "ward": args.ward, "stream": args.stream}
+
+
+def county_path(args):
+    return os.path.join(args.download_dir, f"county-{args.product}.txt")
+
+
+def ensure_download(args):
+    path = county_path(args)
+    if os.path.exists(path) and not args.force:
+        print(f"Using {path} (pass --force to download again)")
+        return path
+    from sos_download import fetch_county_file
+
+    return fetch_county_file(args.product, args.download_dir, use_chrome=not args.no_chrome)
+
+
+def ensure_ingest(args):
+    source = ensure_download(args)
+    path = _stage_path("filtered")
+    meta = _stage_meta(args, source)
+    if _is_fresh(path, source, meta) and not args.force:
+        print(f"Using {path}")
+        return path
+    from voter_ingest import load_voter_file, read_filtered_voters
+
+    if args.stream:
+        filtered_df = read_filtered_voters(source, "WARD", args.ward)
+    else:
+        df = load_voter_file(source)
+        filtered_df = df[df["WARD"].str.contains(args.ward, case=False, na=False)]
+    _save_stage(filtered_df.sort_values(by="PRECINCT_NAME"), "filtered", meta)
+    print(f"Filtered {len(filtered_df)} voters into {path}")
+    return path
+
+
+def ensure_score(args):
+    source = ensure_ingest(args)
+    path = _stage_path("scored")
+    meta = _stage_meta(args, county_path(args))
+    if _is_fresh(path, source, meta) and not args.force:
+        print(f"Using {path}")
+        return path
+    import pandas as pd
+    from voter_scores import add_scores
+
+    scored_df = add_scores(pd.read_pickle(source))
+    _save_stage(scored_df, "scored", meta)
+    print(f"Scored {len(scored_df)} voters into {path}")
+    return path
+
+
+def cmd_download(args):
+    print(f"County file: {ensure_download(args)}")
+
+
+def cmd_ingest(args):
+    ensure_ingest(args)
+
+
+def cmd_score(args):
+    ensure_score(args)
+
+
+def cmd_export(args):
+    import pandas as pd
+    from voter_export import export_formats
+
+    df = pd.read_pickle(ensure_score(args))
+    today_str = datetime.today().strftime("%Y-%m-%d")
+    suffix = "-households" if args.households else ""
+    if args.households:
+        from households import build_households
+
+        df = build_households(df)
+    export_formats(df, f"CityOfWarren{today_str}{suffix}.xlsx", f"City_of_{{ward}}-{today_str}{suffix}.xlsx",
+                   args.format, formulas=args.formulas, workers=args.workers)
+
+
+def cmd_rollup(args):
+    import pandas as pd
+    from rollups import build_rollups, write_summary
+
+    df = pd.read_pickle(ensure_score(args))
+    write_summary(df, build_rollups(df), f"CityOfWarren{datetime.today().strftime('%Y-%m-%d')}")
+
+
+def cmd_search(args):
+    source = ensure_download(args)
+    from voter_ingest import load_voter_file
+    from voter_scores import add_scores
+    from voter_search import load_or_build_index
+
+    path = os.path.join(_cache_dir(), f"search-{args.product}.pkl")
+    if args.force and os.path.exists(path):
+        os.remove(path)
+    os.makedirs(_cache_dir(), exist_ok=True)
+    index = load_or_build_index(lambda: add_scores(load_voter_file(source)), source, path)
+    results = index.search(" ".join(args.query), args.limit)
+    if results.empty:
+        print("No matches")
+    else:
+        print(results.to_string(index=False))
+
+
+def cmd_serve(args):
+    import asyncio
+    from lookup_server import LookupServer, load_model
+
+    server = LookupServer(load_model(ensure_score(args), args.rules), args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"Stopped; cache hits {server.cache.hits}, misses {server.cache.misses}")
+
+
+def cmd_archive(args):
+    source = ensure_download(args)
+    from snapshot_archive import ArchiveError, SnapshotArchive, read_text_snapshot
+
+    try:
+        SnapshotArchive(args.archive).add(read_text_snapshot(source), args.date or datetime.today().date())
+    except ArchiveError as e:
+        print(f"Not archived: {e}")
+
+
+def cmd_split_maps(args):
+    split_csv(args.input_file, args.chunk_size, args.group_by, args.output_dir)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="City of Warren voter pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stages = argparse.ArgumentParser(add_help=False)
+    stages.add_argument("--product", type=int, default=TRUMBULL, help=f"SOS county number (default: {TRUMBULL})")
+    stages.add_argument("--download-dir", default=os.path.join(os.getcwd(), "downloads"))
+    stages.add_argument("--no-chrome", action="store_true", help="never fall back to a Chrome download")
+    stages.add_argument("--ward", default=CITY_WARD, help=f"keep rows whose WARD contains this (default: {CITY_WARD})")
+    stages.add_argument("--stream", action="store_true", help="filter the county file chunk by chunk")
+    stages.add_argument("--force", action="store_true", help="rerun every stage even if its output is cached")
+
+    commands.add_parser("download", parents=[stages], help="download the county file").set_defaults(func=cmd_download)
+    commands.add_parser("ingest", parents=[stages], help="filter and sort the city's voters").set_defaults(func=cmd_ingest)
+    commands.add_parser("score", parents=[stages], help="score the filtered voters").set_defaults(func=cmd_score)
+
+    export = commands.add_parser("export", parents=[stages], help="write the city and ward workbooks")
+    export.add_argument("--workers", type=int, default=1, help="processes used to write the files")
+    export.add_argument("--households", action="store_true", help="one row per household instead of per voter")
+    export.add_argument("--format", nargs="+", choices=EXPORT_FORMATS, default=["xlsx"],
+                        help="file formats to write (default: xlsx)")
+    export.add_argument("--formulas", action="store_true", help="the scores, DISPLAY and StreetName as live Excel formulas")
+    export.set_defaults(func=cmd_export)
+
+    commands.add_parser("rollup", parents=[stages], help="write ward and precinct turnout/score summaries") \
+        .set_defaults(func=cmd_rollup)
+
+    search = commands.add_parser("search", parents=[stages], help="fuzzy search the county by name, birth year and address")
+    search.add_argument("query", nargs="+", help='e.g. "1256 arthur" or "toles born 1959"')
+    search.add_argument("--limit", type=int, default=20, help="most matches to show (default: 20)")
+    search.set_defaults(func=cmd_search)
+
+    serve = commands.add_parser("serve", parents=[stages], help="serve voter, household, rollup and target lookups")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole network)")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--rules", help="rule file whose targets /target?name= serves")
+    serve.add_argument("--workers", type=int, default=4, help="threads used to answer requests")
+    serve.set_defaults(func=cmd_serve)
+
+    archive = commands.add_parser("archive", parents=[stages], help="add the county file to the snapshot archive")
+    archive.add_argument("--archive", help="archive directory (default: archive/)")
+    archive.add_argument("--date", help="download date, YYYY-MM-DD (default: today)")
+    archive.set_defaults(func=cmd_archive)
+
+    split = commands.add_parser("split-maps", help="split a Maps target CSV into import-sized files")
+    split.add_argument("input_file")
+    split.add_argument("--chunk-size", type=int, default=MAPS_IMPORT_LIMIT,
+                       help=f"maximum rows per output file (default: {MAPS_IMPORT_LIMIT})")
+    split.add_argument("--group-by", default="WARD", help="column to split on (default: WARD)")
+    split.add_argument("--output-dir", default=".", help="directory for the output files")
+    split.set_defaults(func=cmd_split_maps)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())